@@ -18,22 +18,58 @@ def create_app():
 
     app.config['SECRET_KEY'] = 'your-secret-key'
 
+    from app.utils.db_pool import engine_options, pool_metrics
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
     db.init_app(app)
     migrate.init_app(app, db)
     bcrypt.init_app(app)
     login_manager.init_app(app)
+    pool_metrics.init_app(app)
 
-    
+    from app.utils.enrichment import enrichment
+    enrichment.init_app(app)
+
+    from app.utils.short_cache import short_code_cache
+    short_code_cache.init_app(app)
+
+    from app.utils.click_buffer import click_buffer
+    click_buffer.init_app(app)
+
+    from app.utils import search_index
+    search_index.init_app(app)
+
+    from app.utils.tags import tag_resolver
+    tag_resolver.init_app(app)
+
+    from app.utils.qr_cache import qr_cache
+    qr_cache.init_app(app)
+
+    from app.utils.short_codes import short_codes
+    short_codes.init_app(app)
+
+    from app.utils.instrumentation import instrumentation
+    instrumentation.init_app(app)
+
+    from app.utils.user_cache import user_cache
+    user_cache.init_app(app)
+
+    # current_user is a CachedUser (id, username), not the User row
     @login_manager.user_loader
     def load_user(user_id):
-        from app.models.user import User
-        return User.query.get(int(user_id))
+        return user_cache.load(user_id)
 
     from app.models.user import User
     from app.models.bookmark import Bookmark
     from app.models.tag import Tag
     from app.models.user_bookmark import UserBookmark
     from app.models.tag_user_bookmark import tag_user_bookmarks
+    from app.models.url_metadata import UrlMetadata
+    from app.models.user_tag_count import UserTagCount
+    from app.models.user_stats import UserStats
+    from app.models.bookmark_change import BookmarkChange
+    from app.models.short_code_sequence import ShortCodeSequence
 
     # Blueprints
     from app.routes.bookmark_routes import bp as bookmark_bp, short_bp
@@ -43,57 +79,15 @@ def create_app():
     app.register_blueprint(user_bp, url_prefix='/api/users')
     app.register_blueprint(short_bp)
 
-    # auto update tag_user_bookmark.bookmark_count
-    from sqlalchemy import event
-    from app.models.bookmark import Bookmark
-    from app.models.user_bookmark import UserBookmark
-    from app.models.tag import Tag
-    from app.models.tag_user_bookmark import tag_user_bookmarks
+    # per-(user, tag) counts, applied as batched deltas before each commit
+    from app.utils import tag_counter
+    tag_counter.init_app(app)
+
+    from app.utils import user_stats
+    user_stats.init_app(app)
 
-    @event.listens_for(db.session, "after_commit")
-    def update_tag_counts(session):
-        # Cllect affected user_ids and tag_ids
-        affected_pairs = set()
-
-        for obj in session.new.union(session.dirty).union(session.deleted):
-            # bookmark modified → check its tag associations + all users who saved it
-            if isinstance(obj, Bookmark):
-                # all users who saved this bookmark
-                users = obj.user_bookmarks.all()
-                tags = obj.tags.all()
-                for ub in users:
-                    for t in tags:
-                        affected_pairs.add((ub.user_id, t.id))
-
-            # userBookmark created/updated/deleted
-            elif isinstance(obj, UserBookmark):
-                # bookmark may have tags
-                tags = obj.bookmark.tags.all()
-                for t in tags:
-                    affected_pairs.add((obj.user_id, t.id))
-
-        # no updates needed
-        if not affected_pairs:
-            return
-
-        # recalc bookmark_count for each (user, tag)
-        for (user_id, tag_id) in affected_pairs:
-            count = session.execute(
-                db.select(db.func.count())
-                .select_from(tag_user_bookmarks)
-                .where(tag_user_bookmarks.c.user_id == user_id)
-                .where(tag_user_bookmarks.c.tag_id == tag_id)
-            ).scalar()
-
-            # update all rows for this (user_id, tag_id)
-            session.execute(
-                db.update(tag_user_bookmarks)
-                .where(tag_user_bookmarks.c.user_id == user_id)
-                .where(tag_user_bookmarks.c.tag_id == tag_id)
-                .values(bookmark_count=count)
-            )
-
-        session.commit()
+    from app.utils import change_log
+    change_log.init_app(app)
 
     from app.auth.auth import auth  # added auth blueprint import
     app.register_blueprint(auth, url_prefix='/auth')  # registered auth blueprint
@@ -2,7 +2,6 @@ import click
 import requests
 import json
 import os
-from urllib.parse import urlencode
 
 BASE_URL = "http://127.0.0.1:5000"
 SESSION_FILE = ".linkvault_session"
@@ -143,8 +142,11 @@ def create(url, title, notes, tags, archived):
 @click.option("--q")
 @click.option("--archived", is_flag=True)
 @click.option("--format-json", is_flag=True)
-def list(tag, q, archived, format_json):
-    """GET /api/bookmarks — list all bookmarks"""
+@click.option("--per-page", type=int, help="Bookmarks per page (server default 50)")
+@click.option("--cursor", help="next_cursor from the previous page")
+@click.option("--all", "fetch_all", is_flag=True, help="Follow next_cursor and print every page as one list")
+def list(tag, q, archived, format_json, per_page, cursor, fetch_all):
+    """GET /api/bookmarks — list bookmarks one page at a time"""
     params = {}
 
     if tag:
@@ -155,16 +157,32 @@ def list(tag, q, archived, format_json):
         params["archived"] = "true"
     if format_json:
         params["format"] = "json"
+    if per_page:
+        params["per_page"] = per_page
+    if cursor:
+        params["cursor"] = cursor
 
     url = f"{BASE_URL}/api/bookmarks"
-    if params:
-        url += "?" + urlencode(params)
-
     headers = {"Accept": "application/json"}
 
-    r = session.get(url, headers=headers)
-    _print(r)
+    if not fetch_all:
+        r = session.get(url, params=params, headers=headers)
+        _print(r)
+        return
 
+    bookmarks = []
+    while True:
+        r = session.get(url, params=params, headers=headers)
+        if r.status_code != 200:
+            _print(r)
+            return
+        data = r.json()
+        bookmarks.extend(data["bookmarks"])
+        if not data.get("next_cursor"):
+            break
+        params["cursor"] = data["next_cursor"]
+
+    click.echo(json.dumps({"bookmarks": bookmarks, "count": len(bookmarks)}, indent=2, ensure_ascii=False))
 
 
 # ---------------------------------------------------------
@@ -225,13 +243,67 @@ def toggle_archive(bookmark_id):
 
 
 # ---------------------------------------------------------
-# EXPORT BOOKMARKS (HTML)
+# BATCH OPERATIONS
+# ---------------------------------------------------------
+@cli.command()
+@click.argument("op", type=click.Choice(["archive", "unarchive", "delete", "add-tags", "remove-tags"]))
+@click.argument("bookmark_ids", type=int, nargs=-1, required=True)
+@click.option("--tags", multiple=True, help="Tags for add-tags / remove-tags")
+def batch(op, bookmark_ids, tags):
+    """POST /api/bookmarks/batch — one operation over many bookmarks"""
+    operation = {"op": op, "ids": list(bookmark_ids)}
+    if tags:
+        operation["tags"] = _split_tags(tags)
+    r = session.post(f"{BASE_URL}/api/bookmarks/batch", json={"operations": [operation]})
+    _print(r)
+
+
+# ---------------------------------------------------------
+# DELTA SYNC (local mirror)
+# ---------------------------------------------------------
+@cli.command()
+@click.option("--mirror", "mirror_file", type=click.Path(), default="linkvault_mirror.json",
+              help="Local copy of your bookmarks, updated in place")
+@click.option("--full", is_flag=True, help="Ignore the saved token and download everything again")
+def sync(mirror_file, full):
+    """GET /api/sync — fetch only what changed since the last sync"""
+    state = {"since": None, "bookmarks": {}}
+    if os.path.exists(mirror_file) and not full:
+        with open(mirror_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+
+    changed = removed = 0
+    while True:
+        params = {"since": state["since"]} if state["since"] else {}
+        r = session.get(f"{BASE_URL}/api/sync", params=params)
+        if r.status_code != 200:
+            _print(r)
+            return
+        data = r.json()
+        for b in data["bookmarks"]:
+            state["bookmarks"][str(b["id"])] = b
+        for bookmark_id in data["deleted"]:
+            state["bookmarks"].pop(str(bookmark_id), None)
+        changed += len(data["bookmarks"])
+        removed += len(data["deleted"])
+        state["since"] = data["since"]
+        if not data["has_more"]:
+            break
+
+    with open(mirror_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    click.echo(f"{changed} updated, {removed} removed, {len(state['bookmarks'])} total → {mirror_file}")
+
+
+# ---------------------------------------------------------
+# EXPORT BOOKMARKS (HTML / JSONL / CSV)
 # ---------------------------------------------------------
 @cli.command()
 @click.argument("output_file", type=click.Path())
-def export(output_file):
-    """GET /api/export — downloads an HTML file"""
-    r = session.get(f"{BASE_URL}/api/export", stream=True)
+@click.option("--format", "fmt", type=click.Choice(["html", "jsonl", "csv"]), default="html")
+def export(output_file, fmt):
+    """GET /api/export — downloads the bookmarks file"""
+    r = session.get(f"{BASE_URL}/api/export", params={"format": fmt}, stream=True)
 
     if r.status_code != 200:
         _print(r)
@@ -244,6 +316,41 @@ def export(output_file):
     click.echo(f"Exported → {output_file}")
 
 
+# ---------------------------------------------------------
+# IMPORT BOOKMARKS (HTML / JSONL)
+# ---------------------------------------------------------
+@cli.command(name="import")
+@click.argument("input_file", type=click.Path(exists=True))
+@click.option("--format", "fmt", type=click.Choice(["html", "jsonl"]))
+def import_file(input_file, fmt):
+    """POST /api/import — bulk import a Netscape HTML or JSON lines file"""
+    params = {"format": fmt} if fmt else {}
+
+    with open(input_file, "rb") as f:
+        r = session.post(
+            f"{BASE_URL}/api/import",
+            params=params,
+            files={"file": (os.path.basename(input_file), f)},
+            stream=True,
+        )
+
+    if r.status_code != 200:
+        _print(r)
+        return
+
+    for line in r.iter_lines():
+        if not line:
+            continue
+        update = json.loads(line)
+        for err in update.get("errors", []):
+            click.echo(f"  row {err.get('row')}: {err.get('error')} {err.get('url') or ''}")
+        click.echo(
+            f"{'Done' if update.get('done') else 'Progress'}: "
+            f"{update['processed']} processed, {update['imported']} imported, "
+            f"{update['skipped']} skipped, {update['failed']} failed"
+        )
+
+
 # ---------------------------------------------------------
 # GENERATE QR CODE
 # ---------------------------------------------------------
@@ -1,13 +1,11 @@
 from app import db
 from .user_bookmark import UserBookmark
-import secrets
-import string
 from urllib.parse import urlparse
 from flask import url_for
 
-def generate_short_code(length: int = 6) -> str:
-    alphabet = string.ascii_letters + string.digits
-    return ''.join(secrets.choice(alphabet) for _ in range(length))
+def generate_short_code() -> str:
+    from app.utils.short_codes import short_codes
+    return short_codes.next_code()
 
 def normalize_url(url: str) -> str:
     parsed = urlparse(url)
@@ -24,6 +22,9 @@ class Bookmark(db.Model):
     url = db.Column(db.String(255), nullable=False, unique=True)
     hash_url = db.Column(db.String(32), nullable=False, unique=True)
     short_url = db.Column(db.String(20), nullable=False, unique=True)
+    # visit analytics, written in batches by app.utils.click_buffer
+    click_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_visited_at = db.Column(db.DateTime, nullable=True)
 
     # relationships
     user_bookmarks = db.relationship(
@@ -46,22 +47,81 @@ class Bookmark(db.Model):
         self.short_url = generate_short_code()
 
     def to_dict(self, user_id=None):
-        data = {
+        if user_id:
+            return serialize_bookmarks([self], user_id)[0]
+        data = self._base_dict(url_for('short.home', _external=True))
+        data['tags'] = [t.name for t in self.tags]
+        return data
+
+    def _base_dict(self, short_base):
+        return {
             'id': self.id,
             'url': self.url,
             'hash_url': self.hash_url,
             'short_url': self.short_url,
-            'full_short_url': url_for('short.redirect_short', short_code=self.short_url, _external=True),
-            'tags': [t.name for t in self.tags]
+            'full_short_url': short_base + self.short_url,
+            'click_count': self.click_count or 0,
+            'last_visited_at': self.last_visited_at.isoformat() + 'Z' if self.last_visited_at else None,
         }
-        if user_id:
-            ub = self.user_bookmarks.filter_by(user_id=user_id).first()
-            if ub:
-                data.update({
-                    'title': ub.title,
-                    'notes': ub.notes,
-                    'archived': ub.archived,
-                    'created_at': ub.created_at.isoformat() + 'Z',
-                    'updated_at': ub.updated_at.isoformat() + 'Z' if ub.updated_at else None
-                })
-        return data
\ No newline at end of file
+
+
+# keep IN (...) lists well under SQLite's bound-parameter limit
+SERIALIZE_CHUNK = 500
+
+def serialize_bookmarks(bookmarks, user_id):
+    """
+    Bulk version of Bookmark.to_dict(user_id=...): loads the user's
+    UserBookmark rows and tag names for the whole list in two queries
+    (per 500 bookmarks) instead of two queries per bookmark.
+    """
+    from app.models.tag import Tag
+    from app.models.tag_user_bookmark import tag_user_bookmarks
+
+    bookmarks = list(bookmarks)
+    if not bookmarks:
+        return []
+
+    ids = [b.id for b in bookmarks]
+    user_bookmarks = {}
+    tag_names = {}
+    for i in range(0, len(ids), SERIALIZE_CHUNK):
+        chunk = ids[i:i + SERIALIZE_CHUNK]
+
+        for ub in UserBookmark.query.filter(
+            UserBookmark.user_id == user_id,
+            UserBookmark.bookmark_id.in_(chunk)
+        ):
+            user_bookmarks[ub.bookmark_id] = ub
+
+        rows = db.session.execute(
+            db.select(tag_user_bookmarks.c.bookmark_id, Tag.name)
+            .join(Tag, Tag.id == tag_user_bookmarks.c.tag_id)
+            .where(
+                tag_user_bookmarks.c.user_id == user_id,
+                tag_user_bookmarks.c.bookmark_id.in_(chunk)
+            )
+        )
+        for bookmark_id, name in rows:
+            tag_names.setdefault(bookmark_id, []).append(name)
+
+    # sorted here: ORDER BY tag.name lets the planner walk the whole tag table in name order
+    for names in tag_names.values():
+        names.sort()
+
+    short_base = url_for('short.home', _external=True)
+    result = []
+    for b in bookmarks:
+        data = b._base_dict(short_base)
+        data['tags'] = tag_names.get(b.id, [])
+        ub = user_bookmarks.get(b.id)
+        if ub:
+            data.update({
+                'title': ub.title,
+                'notes': ub.notes,
+                'archived': ub.archived,
+                'created_at': ub.created_at.isoformat() + 'Z',
+                'updated_at': ub.updated_at.isoformat() + 'Z' if ub.updated_at else None,
+                'enrichment_status': ub.enrichment_status
+            })
+        result.append(data)
+    return result
@@ -0,0 +1,21 @@
+from datetime import datetime
+from app import db
+
+
+class BookmarkChange(db.Model):
+    """
+    Latest change to one of a user's bookmarks, for delta sync. One row per
+    (user, bookmark), re-stamped with the user's version on every change;
+    deleted rows stay behind as tombstones. Maintained by app.utils.change_log.
+    """
+    __tablename__ = 'bookmark_change'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    bookmark_id = db.Column(db.Integer, db.ForeignKey('bookmark.id'), primary_key=True)
+    seq = db.Column(db.Integer, nullable=False)              # user_stats.version of the change
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_bookmark_change_user_seq', 'user_id', 'seq', 'bookmark_id'),
+    )
@@ -0,0 +1,9 @@
+from app import db
+
+
+class ShortCodeSequence(db.Model):
+    """Next unreserved value of a short code sequence, handed out in blocks by app.utils.short_codes."""
+    __tablename__ = 'short_code_sequence'
+
+    name = db.Column(db.String(32), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=0)
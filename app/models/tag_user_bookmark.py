@@ -5,6 +5,9 @@ tag_user_bookmarks = db.Table(
     db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True),
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
     db.Column('bookmark_id', db.Integer, db.ForeignKey('bookmark.id'), primary_key=True),
-    db.Column('bookmark_count', db.Integer, default=0),  # ← YES, here
-    db.UniqueConstraint('tag_id', 'user_id', 'bookmark_id', name='uq_tag_user_bookmark')
-)
\ No newline at end of file
+    db.UniqueConstraint('tag_id', 'user_id', 'bookmark_id', name='uq_tag_user_bookmark'),
+    # the primary key leads with tag_id; per-bookmark tag lookups need their own index
+    db.Index('ix_tag_user_bookmark_user_bookmark', 'user_id', 'bookmark_id'),
+    # tag filters and per-tag deletes within one user's bookmarks
+    db.Index('ix_tag_user_bookmark_user_tag', 'user_id', 'tag_id', 'bookmark_id')
+)
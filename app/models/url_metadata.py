@@ -0,0 +1,32 @@
+from app import db
+from datetime import datetime, timedelta
+
+class UrlMetadata(db.Model):
+    """Fetched page metadata shared by every user who saves the same URL."""
+    __tablename__ = 'url_metadata'
+
+    hash_url = db.Column(db.String(32), primary_key=True)   # same key as Bookmark.hash_url
+    title = db.Column(db.String(255))
+    keywords = db.Column(db.Text, default='')               # comma-separated
+    description = db.Column(db.Text)
+    etag = db.Column(db.String(255))
+    last_modified = db.Column(db.String(64))
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def is_fresh(self, ttl_seconds):
+        return self.fetched_at + timedelta(seconds=ttl_seconds) > datetime.utcnow()
+
+    def update_from(self, meta):
+        self.title = (meta.get('title') or '')[:255] or None
+        self.keywords = ','.join(meta.get('keywords') or [])
+        self.description = meta.get('description')
+        self.etag = meta.get('etag')
+        self.last_modified = meta.get('last_modified')
+        self.fetched_at = datetime.utcnow()
+
+    def to_meta(self):
+        return {
+            'title': self.title,
+            'keywords': [kw for kw in (self.keywords or '').split(',') if kw],
+            'description': self.description,
+        }
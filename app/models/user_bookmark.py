@@ -11,6 +11,14 @@ class UserBookmark(db.Model):
     archived = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
+    # background title/tag fetch: pending | complete | failed | skipped (None = not needed)
+    enrichment_status = db.Column(db.String(16), nullable=True)
+
+    __table_args__ = (
+        # per-user listings, newest first, keyed on (created_at, bookmark_id)
+        db.Index('ix_user_bookmark_user_created', 'user_id', 'created_at', 'bookmark_id'),
+        db.Index('ix_user_bookmark_user_archived_created', 'user_id', 'archived', 'created_at', 'bookmark_id'),
+    )
 
     # relationships
     user = db.relationship('User', back_populates='saved_bookmarks')
@@ -22,7 +30,8 @@ class UserBookmark(db.Model):
             'notes': self.notes,
             'archived': self.archived,
             'created_at': self.created_at.isoformat() + 'Z',
-            'updated_at': self.updated_at.isoformat() + 'Z' if self.updated_at else None
+            'updated_at': self.updated_at.isoformat() + 'Z' if self.updated_at else None,
+            'enrichment_status': self.enrichment_status
         }
         if user_id:
             data.update(self.bookmark.to_dict(user_id=user_id))
@@ -0,0 +1,34 @@
+import json
+from datetime import datetime
+from app import db
+
+
+class UserStats(db.Model):
+    """Per-user dashboard numbers, maintained incrementally by app.utils.user_stats."""
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    bookmark_count = db.Column(db.Integer, nullable=False, default=0)
+    archived_count = db.Column(db.Integer, nullable=False, default=0)
+    tag_count = db.Column(db.Integer, nullable=False, default=0)
+    top_tags = db.Column(db.Text, nullable=False, default='[]')     # JSON [{"name", "count"}], most used first
+    version = db.Column(db.Integer, nullable=False, default=1)        # bumped on every change to the user's bookmarks
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def active_count(self):
+        return self.bookmark_count - self.archived_count
+
+    def top_tag_list(self):
+        return json.loads(self.top_tags or '[]')
+
+    def to_dict(self):
+        return {
+            'bookmarks': self.bookmark_count,
+            'active': self.active_count,
+            'archived': self.archived_count,
+            'tags': self.tag_count,
+            'top_tags': self.top_tag_list(),
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,11 @@
+from app import db
+
+class UserTagCount(db.Model):
+    """How many of a user's bookmarks carry a tag, maintained by app.utils.tag_counter."""
+    __tablename__ = 'user_tag_count'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tag.id'), primary_key=True)
+    bookmark_count = db.Column(db.Integer, nullable=False, default=0)
+
+    tag = db.relationship('Tag')
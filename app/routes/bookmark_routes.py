@@ -1,19 +1,37 @@
 import os
 import tempfile
-from flask import Blueprint, current_app, render_template, request, jsonify, session, url_for, redirect, Response
+from flask import Blueprint, current_app, render_template, request, jsonify, session, url_for, redirect, Response, stream_with_context
 from flask_login import login_required, current_user
 from app import db
-from app.models.bookmark import Bookmark, generate_url_hash, normalize_url 
+from app.models.bookmark import Bookmark, generate_url_hash, normalize_url, serialize_bookmarks
 from app.models.tag import Tag
 from app.models.user import User
 from app.models.user_bookmark import UserBookmark
 from app.models.tag_user_bookmark import tag_user_bookmarks
+from app.models.user_tag_count import UserTagCount
 from urllib.parse import urljoin
 import pytz
 from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
-import segno
+from app.utils.enrichment import enrichment, PLACEHOLDER_TITLE, STATUS_PENDING, STATUS_SKIPPED, STATUS_COMPLETE
+from app.utils.metadata_cache import get_cached_metadata
+from app.utils.short_cache import short_code_cache
+from app.utils.qr_cache import qr_cache, FORMATS as QR_FORMATS
+from app.utils.click_buffer import click_buffer
+from app.utils.pagination import keyset_page, ranked_page, page_size, InvalidCursor, encode_sync_token, decode_sync_token, PAGE_PARAM_REMOVED
+from app.utils.change_log import changes_since
+from app.utils import search_index
+from app.utils.tag_counter import unlink_tags
+from app.utils.tags import tag_bookmarks, set_bookmark_tags
+from app.utils import importer
+from app.utils import exporter
+from app.utils import batch
+from app.utils.user_stats import get_user_stats
+from app.utils.http_cache import user_conditional
+import json
+import base64
+
+QR_DEFAULT_SCALE = 5
+QR_MAX_SCALE = 20
 
 # blueprints
 bp = Blueprint('bookmarks_api', __name__, url_prefix='/api')
@@ -26,32 +44,7 @@ def home():
     if current_user.is_authenticated:
         return redirect(url_for('bookmarks_api.dashboard'))
     return render_template('landing.html'), 200
-    
-def extract_meta_keywords(url):
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        resp = requests.get(url, headers=headers, timeout=6)
-        resp.raise_for_status()
-
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        # Find meta keywords tag
-        meta_tag = soup.find("meta", attrs={"name": "keywords"})
-        if not meta_tag:
-            return []
-
-        content = meta_tag.get("content")
-        if not content:
-            return []
-
-        # Convert comma-separated string → list of tags
-        tags = [kw.strip().lower() for kw in content.split(",") if kw.strip()]
 
-        return tags
-
-    except Exception:
-        return []
-    
 
 @bp.route('/', methods=['GET'])
 @login_required
@@ -59,31 +52,46 @@ def dashboard():
     # Get username from Flask-Login's current_user
     username = current_user.username
     user_id = current_user.id
-    total_bookmarks = UserBookmark.query.filter_by(user_id=user_id).count()
-    archived_bookmarks = UserBookmark.query.filter_by(user_id=user_id, archived=True).count()
+    stats = get_user_stats(user_id)
 
-    return render_template('welcome.html',username=username), 200
+    return render_template('welcome.html',username=username, stats=stats), 200
 
 
 # short url redirect
 @short_bp.route('/<short_code>')
-def redirect_short(short_code):   
-    bookmark = Bookmark.query.filter_by(short_url=short_code).first_or_404()
-    bookmark.updated_at = datetime.utcnow()
-    db.session.commit()
-    return redirect(bookmark.url)
-
-# title extraction using web scrapping
-def extract_title(url):
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers, timeout=8)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        title_tag = soup.find('title')
-        return title_tag.get_text(strip=True) if title_tag else None
-    except Exception:
-        return None
+def redirect_short(short_code):
+    # warm cache → no database round trip at all
+    cached = short_code_cache.get(short_code)
+    if cached is None:
+        bookmark = Bookmark.query.filter_by(short_url=short_code).first_or_404()
+        cached = (bookmark.id, bookmark.url)
+        short_code_cache.put(short_code, *cached)
+    # counted in memory, written in batches by the click flusher
+    click_buffer.record(cached[0])
+    return redirect(cached[1])
+
+# QR image for a short code, binary and cacheable by browsers and CDNs
+@short_bp.route('/qr/<short_code>.<fmt>')
+def qr_image(short_code, fmt):
+    if fmt not in QR_FORMATS:
+        return jsonify({'error': 'format must be png or svg'}), 404
+    scale = request.args.get('scale', QR_DEFAULT_SCALE, type=int)
+    if not 1 <= scale <= QR_MAX_SCALE:
+        return jsonify({'error': f'scale must be between 1 and {QR_MAX_SCALE}'}), 400
+
+    cached = short_code_cache.get(short_code)
+    if cached is None:
+        bookmark = Bookmark.query.filter_by(short_url=short_code).first_or_404()
+        cached = (bookmark.id, bookmark.url)
+        short_code_cache.put(short_code, *cached)
+    url = cached[1]
+
+    # the image depends only on the url, which never changes for a short code
+    hash_url = generate_url_hash(url)
+    response = Response(qr_cache.render(url, hash_url, scale, fmt), mimetype=QR_FORMATS[fmt])
+    response.set_etag(f'{hash_url}-{scale}.{fmt}')
+    response.headers['Cache-Control'] = f"public, max-age={current_app.config.get('QR_MAX_AGE', 31536000)}, immutable"
+    return response.make_conditional(request)
 
 # bookmark creation route
 @bp.route('/bookmarks', methods=['POST'])
@@ -104,11 +112,6 @@ def create_bookmark():
     url_hash = generate_url_hash(norm_url)
     existing = Bookmark.query.filter_by(hash_url=url_hash).first()
 
-    if not tags:  
-        auto_tags = extract_meta_keywords(norm_url)
-        if auto_tags:
-            tags = auto_tags
-
     if existing:
         # Check if user already has this bookmark
         ub = UserBookmark.query.filter_by(
@@ -120,8 +123,6 @@ def create_bookmark():
             return jsonify({'error': 'You already saved this link'}), 409
         
         bookmark = existing
-        if not title:
-            title = extract_title(norm_url) or "Untitled Link"
     else:
         bookmark = Bookmark(url=norm_url)
         bookmark.set_hash()
@@ -129,38 +130,50 @@ def create_bookmark():
         db.session.add(bookmark)
         db.session.flush()
 
+    # missing title/tags come from the shared metadata cache when another
+    # user already saved this URL, otherwise they are fetched in the background
+    need_title = not title
+    need_tags = not tags
+    status = None
+    if need_title or need_tags:
+        cached = get_cached_metadata(url_hash)
+        if cached:
+            if need_title:
+                title = cached['title'] or PLACEHOLDER_TITLE
+            if need_tags:
+                tags = cached['keywords']
+            status = STATUS_COMPLETE
+        else:
+            status = STATUS_PENDING if enrichment.reserve() else STATUS_SKIPPED
+
+    # a reserved slot is only handed over with the job below; give it back on any failure
+    try:
         if not title:
-            title = extract_title(norm_url) or "Untitled Link"
+            title = PLACEHOLDER_TITLE
 
-    # Create UserBookmark
-    ub = UserBookmark(
-        user_id=user_id,
-        bookmark_id=bookmark.id,
-        title=title,
-        notes=notes,
-        archived=archived
-    )
-    db.session.add(ub)
-
-    # Handle tags
-    if tags:
-        for tag_name in tags:
-            tag_name = tag_name.strip().lower()
-            if tag_name:
-                tag = Tag.query.filter_by(name=tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    db.session.add(tag)
-                    db.session.flush()
-                db.session.execute(
-                    tag_user_bookmarks.insert().values(
-                        tag_id=tag.id,
-                        user_id=user_id,
-                        bookmark_id=bookmark.id
-                    )
-                )
+        # Create UserBookmark
+        ub = UserBookmark(
+            user_id=user_id,
+            bookmark_id=bookmark.id,
+            title=title,
+            notes=notes,
+            archived=archived,
+            enrichment_status=status
+        )
+        db.session.add(ub)
 
-    db.session.commit()
+        # Handle tags
+        if tags:
+            tag_bookmarks(user_id, [bookmark.id], tags)
+
+        db.session.commit()
+    except Exception:
+        if status == STATUS_PENDING:
+            enrichment.release()
+        raise
+
+    if status == STATUS_PENDING:
+        enrichment.submit(user_id, bookmark.id, norm_url, need_title, need_tags)
 
     return jsonify({
         'message': 'Bookmark saved successfully',
@@ -171,6 +184,7 @@ def create_bookmark():
 # get single bookmark
 @bp.route('/bookmarks/<int:bookmark_id>', methods=['GET'])
 @login_required
+@user_conditional(require_user_id=True, always_json=True)
 def get_bookmark(bookmark_id):
     bookmark = Bookmark.query.get(bookmark_id)
     if not bookmark:
@@ -211,27 +225,7 @@ def update_bookmark(bookmark_id):
 
     if 'tags' in data:
 
-        db.session.execute(
-            tag_user_bookmarks.delete().where(
-                tag_user_bookmarks.c.bookmark_id == bookmark_id,
-                tag_user_bookmarks.c.user_id == user_id
-            )
-        )
-        for tag_name in data.get('tags', []):
-            tag_name = tag_name.strip().lower()
-            if tag_name:
-                tag = Tag.query.filter_by(name=tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    db.session.add(tag)
-                    db.session.flush()
-                db.session.execute(
-                    tag_user_bookmarks.insert().values(
-                        tag_id=tag.id,
-                        user_id=user_id,
-                        bookmark_id=bookmark_id
-                    )
-                )
+        set_bookmark_tags(user_id, bookmark_id, data.get('tags', []))
         updated = True
 
     if updated:
@@ -281,14 +275,7 @@ def delete_bookmark(bookmark_id):
 
     try:
         # Step 1: Delete all tag associations for this user-bookmark combination
-        db.session.execute(
-            tag_user_bookmarks.delete().where(
-                db.and_(
-                    tag_user_bookmarks.c.user_id == user_id,
-                    tag_user_bookmarks.c.bookmark_id == bookmark_id
-                )
-            )
-        )
+        unlink_tags(user_id, [bookmark_id])
         
         # Step 2: Delete the UserBookmark entry
         db.session.delete(ub)
@@ -302,7 +289,30 @@ def delete_bookmark(bookmark_id):
         db.session.rollback()
         return jsonify({'error': 'Failed to delete bookmark', 'details': str(e)}), 500
     
-# export bookmark
+# batch operations over many bookmarks in one transaction
+@bp.route('/bookmarks/batch', methods=['POST'])
+@login_required
+def batch_bookmarks():
+    user_id = current_user.id
+
+    try:
+        operations = batch.parse_operations(
+            request.get_json(silent=True),
+            current_app.config.get('BATCH_MAX_IDS', 5000)
+        )
+    except batch.BatchError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        results = batch.run_batch(user_id, operations)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Batch failed, nothing was applied', 'details': str(e)}), 500
+
+    return jsonify({'results': results}), 200
+
+# export bookmarks, streamed (?format=html|jsonl|csv)
 @bp.route('/export', methods=['GET'])
 @login_required
 def export_bookmarks():
@@ -312,262 +322,84 @@ def export_bookmarks():
     if not user_id:
         return jsonify({'error': 'user_id required'}), 400
 
-    bookmarks = db.session.query(Bookmark).join(UserBookmark).filter(UserBookmark.user_id == user_id).all()
-    if not bookmarks:
+    fmt = (request.args.get('format') or 'html').lower()
+    if fmt not in exporter.FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(exporter.FORMATS)}"}), 400
+
+    has_bookmarks = db.session.query(
+        db.select(UserBookmark.bookmark_id).filter_by(user_id=user_id).exists()
+    ).scalar()
+    if not has_bookmarks:
         return jsonify({'error': 'No bookmarks found'}), 404
 
     ist = pytz.timezone('Asia/Kolkata')
-    
-    html = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
-                <META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
-                <TITLE>LinkVault Export</TITLE>
-
-            <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Roboto', 'Oxygen', 'Ubuntu', 'Cantarell', sans-serif;
-                background: #000000;
-                background-image: radial-gradient(circle at 20% 50%, rgba(180, 255, 57, 0.05) 0%, transparent 50%),
-                                radial-gradient(circle at 80% 80%, rgba(193, 227, 40, 0.05) 0%, transparent 50%);
-                min-height: 100vh;
-                padding: 48px 20px;
-                line-height: 1.6;
-                color: #ffffff;
-            }
-
-            .container {
-                max-width: 1152px;
-                margin: 0 auto;
-            }
-
-            .header-section {
-                margin-bottom: 32px;
-                padding-bottom: 24px;
-                border-bottom: 1px solid #1f1f1f;
-            }
-
-            .header-title {
-                font-size: 42px;
-                font-weight: 700;
-                color: #b4ff39;
-                margin-bottom: 8px;
-                letter-spacing: -0.5px;
-            }
-
-            .header-subtitle {
-                color: #9ca3af;
-                font-size: 16px;
-                font-weight: 400;
-            }
-
-            DL {
-                display: block;
-                width: 100%;
-            }
-
-            DT {
-                margin-bottom: 24px;
-            }
-
-            .bookmark-card {
-                display: block;
-                background: #111111;
-                border: 1px solid #1f1f1f;
-                border-radius: 16px;
-                padding: 24px;
-                margin-bottom: 24px;
-                text-decoration: none;
-                transition: all 0.3s ease;
-                backdrop-filter: blur(8px);
-            }
-
-            .bookmark-card:hover {
-                border-color: rgba(193, 227, 40, 0.6);
-                box-shadow: 0 0 15px rgba(193, 227, 40, 0.15);
-                transform: translateY(-2px);
-            }
-
-            .bookmark-title {
-                font-size: 24px;
-                font-weight: 600;
-                color: #ffffff;
-                margin-bottom: 12px;
-                display: block;
-            }
-
-            .bookmark-url {
-                color: #9ca3af;
-                font-size: 16px;
-                word-break: break-all;
-                display: block;
-                margin-bottom: 8px;
-                text-decoration: none;
-            }
-
-            .bookmark-url:hover {
-                color: #c1e328;
-            }
-
-            .bookmark-url::before {
-                content: "🔗 ";
-            }
-
-            .bookmark-tags {
-                display: flex;
-                flex-wrap: wrap;
-                gap: 8px;
-                margin-top: 12px;
-            }
-
-            .tag {
-                background: #263a19;
-                color: #b4ff39;
-                padding: 4px 12px;
-                border-radius: 9999px;
-                font-size: 14px;
-                font-weight: 500;
-            }
-
-            DD {
-                background: rgba(17, 17, 17, 0.6);
-                padding: 16px 24px;
-                border-radius: 12px;
-                font-size: 14px;
-                color: #d1d5db;
-                line-height: 1.6;
-                border-left: 3px solid #263a19;
-                margin-bottom: 24px;
-                margin-left: 0;
-            }
-
-            DD::before {
-                content: "Notes: ";
-                color: #9ca3af;
-                font-weight: 600;
-            }
-
-            .timestamp {
-                font-size: 12px;
-                color: #6b7280;
-                margin-top: 8px;
-            }
-
-            /* Responsive design */
-            @media (max-width: 768px) {
-                body {
-                    padding: 24px 16px;
-                }
-
-                .header-title {
-                    font-size: 32px;
-                }
-
-                .bookmark-card {
-                    padding: 20px;
-                }
-
-                .bookmark-title {
-                    font-size: 20px;
-                }
-            }
-
-            /* Print styles */
-            @media print {
-                body {
-                    background: white;
-                    color: black;
-                }
-
-                .header-title {
-                    color: #000000;
-                }
-
-                .bookmark-card {
-                    background: white;
-                    border: 1px solid #e5e7eb;
-                    box-shadow: none;
-                }
-
-                .bookmark-card:hover {
-                    transform: none;
-                }
-
-                .bookmark-title {
-                    color: #000000;
-                }
-
-                .tag {
-                    background: #e5e7eb;
-                    color: #000000;
-                }
-
-                DD {
-                    background: #f3f4f6;
-                    color: #000000;
-                }
-            }
-        </style>
-
-<div class="container">
-    <div class="header-section">
-        <h1 class="header-title">Your Bookmarks</h1>
-        <p class="header-subtitle">Exported on """ + datetime.now().strftime('%B %d, %Y at %I:%M %p IST') + """</p>
-    </div>
-    <DL><p>
-"""
-
-    for b in bookmarks:
-        ub = UserBookmark.query.filter_by(bookmark_id=b.id, user_id=user_id).first()
-        tags = ",".join(t.name for t in b.tags)
-        title = (ub.title if ub else b.url).replace('&', '&amp;').replace('<', '&lt;')
-        created_ist = (ub.created_at if ub else b.created_at).replace(tzinfo=pytz.UTC).astimezone(ist)
-        add_date = int(created_ist.timestamp())
-        
-        html += f'    <DT><A HREF="{b.url}" ADD_DATE="{add_date}" TAGS="{tags}" class="bookmark-card">\n'
-        html += f'        <span class="bookmark-title">{title}</span>\n'
-        html += f'        <span class="bookmark-url">{b.url}</span>\n'
-        
-        if tags:
-            html += f'        <div class="bookmark-tags">\n'
-            for tag in tags.split(','):
-                html += f'            <span class="tag">{tag.strip()}</span>\n'
-            html += f'        </div>\n'
-        
-        html += f'    </A></DT>\n'
-    html += """    </DL></p>
-</div>"""
+    exported_on = datetime.now(ist).strftime('%B %d, %Y at %I:%M %p IST')
+    short_base = url_for('short.home', _external=True)
+    mimetype, ext = exporter.FORMATS[fmt]
 
     return Response(
-        html,
-        mimetype="text/html",
-        headers={"Content-Disposition": f"attachment;filename=linkvault_user{user_id}_{datetime.now().strftime('%Y%m%d')}.html"}
+        stream_with_context(exporter.export_chunks(fmt, user_id, short_base, exported_on)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment;filename=linkvault_user{user_id}_{datetime.now().strftime('%Y%m%d')}.{ext}"}
     )
 
+# bulk import (Netscape HTML or JSON lines), progress streamed as NDJSON
+@bp.route('/import', methods=['POST'])
+@login_required
+def import_bookmarks():
+    user_id = current_user.id
+
+    upload = request.files.get('file')
+    if upload:
+        filename, mimetype = upload.filename, upload.mimetype
+    else:
+        filename, mimetype = None, request.mimetype
+
+    fmt = importer.detect_format(request.args.get('format'), filename, mimetype)
+    if not fmt:
+        return jsonify({
+            'error': 'Unknown import format',
+            'details': f"Pass ?format= one of: {', '.join(importer.FORMATS)}"
+        }), 400
+
+    stream = importer.detach_upload(upload) if upload else request.stream
+    batch_size = current_app.config.get('IMPORT_BATCH_SIZE', 500)
+    progress = importer.import_bookmarks(user_id, importer.iter_records(stream, fmt), batch_size)
+
+    def generate():
+        try:
+            for update in progress:
+                yield json.dumps(update) + '\n'
+        finally:
+            if upload:
+                stream.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @bp.route('/tags', methods=['GET'])
 @login_required
+@user_conditional
 def list_tags():
     user_id = current_user.id
-    
-    # Count actual tag occurrences for this user
+    stats = get_user_stats(user_id)
+
+    # ?top=N is answered from the stats row alone
+    top = request.args.get('top', type=int)
+    if top and top <= current_app.config.get('USER_STATS_TOP_TAGS', 10):
+        return jsonify(stats.top_tag_list()[:top])
+
+    # Precomputed per-user tag counts
     tags_result = db.session.query(
         Tag.name,
-        db.func.count(tag_user_bookmarks.c.bookmark_id).label('count')
+        UserTagCount.bookmark_count
     ).join(
-        tag_user_bookmarks,
-        Tag.id == tag_user_bookmarks.c.tag_id
+        UserTagCount,
+        Tag.id == UserTagCount.tag_id
     ).filter(
-        tag_user_bookmarks.c.user_id == user_id
-    ).group_by(
-        Tag.id, Tag.name
-    ).having(
-        db.func.count(tag_user_bookmarks.c.bookmark_id) > 0
+        UserTagCount.user_id == user_id,
+        UserTagCount.bookmark_count > 0
     ).order_by(
-        db.desc('count'), Tag.name
+        UserTagCount.bookmark_count.desc(), Tag.name
     ).all()
     
     # Convert tuples to dictionaries
@@ -578,12 +410,77 @@ def list_tags():
         return jsonify(tags)
     
     # Otherwise render HTML template
-    return render_template('tags.html', tags=tags, username=current_user.username)
+    return render_template('tags.html', tags=tags, stats=stats, username=current_user.username)
+
+
+# dashboard numbers for the current user
+@bp.route('/stats', methods=['GET'])
+@login_required
+def get_stats():
+    return jsonify(get_user_stats(current_user.id).to_dict()), 200
+
+# delta sync: bookmarks changed or deleted since a token from the previous call
+@bp.route('/sync', methods=['GET'])
+@login_required
+def sync_bookmarks():
+    user_id = current_user.id
+    limit = request.args.get('limit', type=int) or current_app.config.get('SYNC_PAGE_SIZE', 500)
+    limit = max(1, min(limit, current_app.config.get('SYNC_MAX_PAGE_SIZE', 2000)))
+
+    token = request.args.get('since')
+    try:
+        seq, after, snapshot = decode_sync_token(token) if token else (None, None, True)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    if snapshot:
+        # first sync: everything the user has, taken at the current version;
+        # anything changed meanwhile is replayed by the delta pages that follow
+        if seq is None:
+            seq, after = get_user_stats(user_id).version, 0
+        rows = (
+            db.session.query(Bookmark)
+            .join(UserBookmark, UserBookmark.bookmark_id == Bookmark.id)
+            .filter(UserBookmark.user_id == user_id, UserBookmark.bookmark_id > after)
+            .order_by(UserBookmark.bookmark_id)
+            .limit(limit + 1).all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return jsonify({
+            'bookmarks': serialize_bookmarks(rows, user_id),
+            'deleted': [],
+            'since': encode_sync_token(seq, rows[-1].id, snapshot=True) if has_more else encode_sync_token(seq),
+            'has_more': has_more
+        }), 200
+
+    changes, has_more = changes_since(user_id, seq, after, limit)
+    live_ids = [bookmark_id for bookmark_id, _, deleted in changes if not deleted]
+    deleted = [bookmark_id for bookmark_id, _, deleted in changes if deleted]
+
+    bookmarks = []
+    if live_ids:
+        by_id = {b.id: b for b in Bookmark.query.filter(Bookmark.id.in_(live_ids))}
+        for data in serialize_bookmarks([by_id[i] for i in live_ids if i in by_id], user_id):
+            if 'title' in data:
+                bookmarks.append(data)
+            else:
+                deleted.append(data['id'])  # removed after the change row was read
+
+    if changes:
+        token = encode_sync_token(changes[-1].seq, changes[-1].bookmark_id)
+    return jsonify({
+        'bookmarks': bookmarks,
+        'deleted': deleted,
+        'since': token,
+        'has_more': has_more
+    }), 200
 
 @bp.route('/bookmarks', methods=['GET'])
 @login_required
+@user_conditional
 def list_bookmarks():
-    """List all bookmarks with filtering (no pagination)"""
+    """List bookmarks with filtering, newest first, one keyset page at a time"""
     user_id = current_user.id
 
     # Filters
@@ -598,8 +495,11 @@ def list_bookmarks():
         UserBookmark.user_id == user_id
     )
 
+    if 'page' in request.args:
+        return jsonify({'error': 'Bad Request', 'details': PAGE_PARAM_REMOVED}), 400
+
     # validate allowed query parameters
-    allowed_params = {'page', 'per_page', 'tag', 'q', 'archived', 'id'}
+    allowed_params = {'per_page', 'cursor', 'before', 'format', 'tag', 'q', 'archived', 'id'}
     invalid_params = set(request.args.keys()) - allowed_params
     if invalid_params:
         mainMessage = "Invalid query parameter(s) provided."
@@ -634,30 +534,49 @@ def list_bookmarks():
             Tag,
             Tag.id == tag_user_bookmarks.c.tag_id
         ).filter(
-            Tag.name.ilike(tag_filter.lower())
+            # names are stored lower-cased, so equality can use the unique index on tag.name
+            Tag.name == tag_filter.strip().lower()
         )
 
-    # Apply search filter
+    # Apply search filter (full-text index, ILIKE where the database has none)
+    search_hits = None
     if search_query:
-        search = f"%{search_query}%"
-        query = query.filter(
-            db.or_(
-                UserBookmark.title.ilike(search),
-                UserBookmark.notes.ilike(search),
-                Bookmark.url.ilike(search)
+        search_hits = search_index.match_subquery(user_id, search_query)
+        if search_hits is not None:
+            query = query.join(search_hits, search_hits.c.bookmark_id == Bookmark.id)
+        else:
+            search = f"%{search_query}%"
+            query = query.filter(
+                db.or_(
+                    UserBookmark.title.ilike(search),
+                    UserBookmark.notes.ilike(search),
+                    Bookmark.url.ilike(search)
+                )
             )
-        )
 
     # Apply archived filter
     if archived_filter is not None:
         archived_bool = archived_filter.lower() == 'true'
         query = query.filter(UserBookmark.archived == archived_bool)
 
-    # Fetch all bookmarks (no pagination)
-    bookmarks = query.order_by(UserBookmark.created_at.desc()).all()
+    # Fetch one page: by relevance when searching, else keyed on (created_at, bookmark_id)
+    per_page = page_size(request.args.get('per_page', type=int))
+    cursor = request.args.get('cursor')
+    before = request.args.get('before')
+    try:
+        if search_hits is not None:
+            bookmarks, next_cursor, prev_cursor = ranked_page(
+                query, search_hits.c.score, per_page, cursor=cursor, before=before
+            )
+        else:
+            bookmarks, next_cursor, prev_cursor = keyset_page(
+                query, per_page, cursor=cursor, before=before
+            )
+    except InvalidCursor as e:
+        return jsonify({'error': 'Bad Request', 'details': str(e)}), 400
 
     # Convert to dict
-    bookmark_data = [b.to_dict(user_id=user_id) for b in bookmarks]
+    bookmark_data = serialize_bookmarks(bookmarks, user_id)
 
     # JSON response
     wants_json = (
@@ -669,7 +588,10 @@ def list_bookmarks():
     if wants_json:
         return jsonify({
             'bookmarks': bookmark_data,
-            'total': len(bookmark_data),
+            'count': len(bookmark_data),   # bookmarks on this page
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor,
             'current_tag': tag_filter
         }), 200
 
@@ -678,10 +600,12 @@ def list_bookmarks():
         'tag_filter.html',
         bookmarks=bookmark_data,
         user_id=user_id,
-        total=len(bookmark_data),
         tag=tag_filter,
         q=search_query,
-        current_tag=tag_filter
+        archived=archived_filter,
+        current_tag=tag_filter,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor
     )
 
 
@@ -690,10 +614,8 @@ def list_bookmarks():
 def dashboard2():
     user_id = current_user.id
 
-    # Pagination (optional, default all)
-    page = request.args.get('page', 1, type=int)
     per_page = 5  # you can adjust or paginate
-     
+
     bookmarks_query = (
         db.session.query(Bookmark)
         .join(UserBookmark)
@@ -701,22 +623,25 @@ def dashboard2():
             UserBookmark.user_id == user_id,
             UserBookmark.archived == False    # ⬅ hide archived bookmarks
         )
-        .order_by(UserBookmark.created_at.desc())
     )
 
-    total = bookmarks_query.count()
-    total_pages = (total + per_page - 1) // per_page
-    bookmarks = bookmarks_query.offset((page-1)*per_page).limit(per_page).all()
-    bookmark_data = [b.to_dict(user_id=user_id) for b in bookmarks]
+    try:
+        bookmarks, next_cursor, prev_cursor = keyset_page(
+            bookmarks_query, per_page,
+            cursor=request.args.get('cursor'),
+            before=request.args.get('before')
+        )
+    except InvalidCursor:
+        return redirect(url_for('bookmarks_api.dashboard2'))
+    bookmark_data = serialize_bookmarks(bookmarks, user_id)
 
     return render_template(
         'all_bookmarks.html',
         bookmarks=bookmark_data,
         user_id=user_id,
-        page=page,
         per_page=per_page,
-        total=total,
-        total_pages=total_pages
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor
     )
 
 @bp.route('/bookmarks/<int:bookmark_id>/qr', methods=['GET'])
@@ -740,12 +665,13 @@ def gen_qr(bookmark_id):
     if not bookmark:
         return jsonify({'error': 'Bookmark not found'}), 404
 
-    # 4️⃣ Generate QR
-    qr = segno.make(bookmark.url)
-    qr_data_uri = qr.png_data_uri(scale=5)
+    # 4️⃣ Generate QR (rendered once per url, then served from the cache)
+    png = qr_cache.render(bookmark.url, bookmark.hash_url, QR_DEFAULT_SCALE, 'png')
+    qr_data_uri = 'data:image/png;base64,' + base64.b64encode(png).decode()
 
     return jsonify({
         'qr_data_uri': qr_data_uri,
+        'qr_image_url': url_for('short.qr_image', short_code=bookmark.short_url, fmt='png'),
         'qr_title': ub.title,       # user's title override
         'qr_url': bookmark.url
     }), 200
@@ -774,7 +700,7 @@ def archived_page():
     )
 
     bookmarks = archived_query.all()
-    bookmark_data = [b.to_dict(user_id=user_id) for b in bookmarks]
+    bookmark_data = serialize_bookmarks(bookmarks, user_id)
 
     return render_template(
         'archived.html',
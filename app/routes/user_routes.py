@@ -2,9 +2,11 @@
 from flask import Blueprint, request, jsonify
 from app.models.user import User
 from app.models.user_bookmark import UserBookmark
-from app.models.bookmark import Bookmark
+from app.models.bookmark import Bookmark, serialize_bookmarks
 from app.models.tag import Tag
+from app.models.tag_user_bookmark import tag_user_bookmarks
 from app import db
+from app.utils.pagination import keyset_page, page_size, InvalidCursor, PAGE_PARAM_REMOVED
 from sqlalchemy.exc import IntegrityError
 import re
 
@@ -64,7 +66,14 @@ def get_user_bookmarks(user_id):
         tag = tag.strip().lower()
         if not tag:
             return jsonify({'error': 'Tag cannot be empty'}), 400
-        query = query.join(Bookmark.tags).filter(Tag.name.ilike(tag))
+        # this user's tag links only; seeks ix_tag_user_bookmark_user_tag
+        query = query.join(
+            tag_user_bookmarks,
+            db.and_(
+                tag_user_bookmarks.c.user_id == UserBookmark.user_id,
+                tag_user_bookmarks.c.bookmark_id == UserBookmark.bookmark_id
+            )
+        ).join(Tag, Tag.id == tag_user_bookmarks.c.tag_id).filter(Tag.name == tag)
 
     archived = request.args.get('archived')
     if archived is not None:
@@ -73,21 +82,25 @@ def get_user_bookmarks(user_id):
         archived_bool = archived.lower() == 'true'
         query = query.filter(UserBookmark.archived == archived_bool)
 
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    if page < 1: page = 1
-    if per_page < 1: per_page = 20
+    if 'page' in request.args:
+        return jsonify({'error': PAGE_PARAM_REMOVED}), 400
+    per_page = page_size(request.args.get('per_page', type=int))
 
     try:
-        paginated = query.order_by(Bookmark.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        items, next_cursor, prev_cursor = keyset_page(
+            query.options(db.joinedload(UserBookmark.bookmark)), per_page,
+            cursor=request.args.get('cursor'),
+            before=request.args.get('before')
         )
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
         return jsonify({
-            "bookmarks": [ub.bookmark.to_dict(user_id=user_id) for ub in paginated.items],
-            "total": paginated.total,
-            "pages": paginated.pages,
-            "page": page,
-            "per_page": per_page
+            "bookmarks": serialize_bookmarks([ub.bookmark for ub in items], user_id),
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor
         }), 200
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve bookmarks', 'details': str(e)}), 500
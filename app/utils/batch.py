@@ -0,0 +1,184 @@
+"""
+Batch operations over many of a user's bookmarks in one transaction.
+
+Each operation is applied with set-based statements over the ids the user
+actually owns; tag counts are settled once when the batch commits.
+"""
+from datetime import datetime
+from app import db
+from app.models.user_bookmark import UserBookmark
+from app.models.tag_user_bookmark import tag_user_bookmarks
+from app.utils import search_index
+from app.utils.bulk import chunked
+from app.utils.tag_counter import link_tags, unlink_tags
+from app.utils.tags import clean_tag_names, resolve_tag_ids
+from app.utils.user_stats import add_stats_delta
+from app.utils.change_log import record_changes
+
+OPERATIONS = ('archive', 'unarchive', 'delete', 'add_tags', 'remove_tags')
+TAG_OPERATIONS = ('add_tags', 'remove_tags')
+
+STATUS_OK = 'ok'
+STATUS_NOT_FOUND = 'not_found'
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_operations(payload, max_ids):
+    """Validate the request body up front so a bad entry applies nothing."""
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list) or not operations:
+        raise BatchError('operations must be a non-empty list')
+
+    parsed = []
+    total = 0
+    for i, op in enumerate(operations):
+        if not isinstance(op, dict):
+            raise BatchError(f'operation {i} must be an object')
+        name = str(op.get('op') or '').replace('-', '_')
+        if name not in OPERATIONS:
+            raise BatchError(f"operation {i}: op must be one of: {', '.join(OPERATIONS)}")
+
+        ids = op.get('ids')
+        if not isinstance(ids, list) or not ids:
+            raise BatchError(f'operation {i}: ids must be a non-empty list')
+        try:
+            ids = list(dict.fromkeys(int(b) for b in ids))
+        except (TypeError, ValueError):
+            raise BatchError(f'operation {i}: ids must be integers')
+
+        tags = []
+        if name in TAG_OPERATIONS:
+            tags = op.get('tags')
+            if isinstance(tags, str):
+                tags = tags.split(',')
+            tags = clean_tag_names(tags if isinstance(tags, list) else [])
+            if not tags:
+                raise BatchError(f'operation {i}: tags required for {name}')
+
+        total += len(ids)
+        parsed.append({'op': name, 'ids': ids, 'tags': tags})
+
+    if total > max_ids:
+        raise BatchError(f'too many ids in one batch (max {max_ids})')
+    return parsed
+
+
+def _owned(user_id, ids):
+    owned = set()
+    for chunk in chunked(ids, 500):
+        owned.update(db.session.execute(
+            db.select(UserBookmark.bookmark_id).where(
+                UserBookmark.user_id == user_id,
+                UserBookmark.bookmark_id.in_(chunk)
+            )
+        ).scalars())
+    return owned
+
+
+def _set_archived(user_id, ids, archived):
+    now = datetime.utcnow()
+    changed = 0
+    flipped = []
+    for chunk in chunked(ids, 500):
+        # only rows whose flag actually changes reach the change log and the version
+        flip = db.session.execute(
+            db.select(UserBookmark.bookmark_id).where(
+                UserBookmark.user_id == user_id,
+                UserBookmark.bookmark_id.in_(chunk),
+                UserBookmark.archived != archived
+            )
+        ).scalars().all()
+        if not flip:
+            continue
+        result = db.session.execute(
+            db.update(UserBookmark)
+            .where(
+                UserBookmark.user_id == user_id,
+                UserBookmark.bookmark_id.in_(flip),
+                UserBookmark.archived != archived
+            )
+            .values(archived=archived, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        changed += result.rowcount
+        flipped.extend(flip)
+    if changed:
+        add_stats_delta(user_id, 0, changed if archived else -changed)
+        record_changes(user_id, flipped)
+
+
+def _delete(user_id, ids):
+    for chunk in chunked(ids, 500):
+        archived = db.session.scalar(
+            db.select(db.func.count()).select_from(UserBookmark).where(
+                UserBookmark.user_id == user_id,
+                UserBookmark.bookmark_id.in_(chunk),
+                UserBookmark.archived.is_(True)
+            )
+        )
+        add_stats_delta(user_id, -len(chunk), -archived)
+        unlink_tags(user_id, chunk)
+        record_changes(user_id, chunk, deleted=True)
+        db.session.execute(
+            db.delete(UserBookmark)
+            .where(UserBookmark.user_id == user_id, UserBookmark.bookmark_id.in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
+        # bulk deletes skip mapper events, so stats and the index are updated explicitly
+        search_index.unindex_bookmarks(db.session.connection(), user_id, chunk)
+
+
+def _add_tags(user_id, ids, names):
+    tag_ids = list(resolve_tag_ids(names).values())
+    for chunk in chunked(ids, 500):
+        existing = set(db.session.execute(
+            db.select(tag_user_bookmarks.c.bookmark_id, tag_user_bookmarks.c.tag_id).where(
+                tag_user_bookmarks.c.user_id == user_id,
+                tag_user_bookmarks.c.bookmark_id.in_(chunk),
+                tag_user_bookmarks.c.tag_id.in_(tag_ids)
+            )
+        ).tuples())
+        link_tags([
+            {'tag_id': t, 'user_id': user_id, 'bookmark_id': b}
+            for b in chunk for t in tag_ids if (b, t) not in existing
+        ])
+
+
+def _remove_tags(user_id, ids, names):
+    # unknown tag names can't be on any bookmark; don't create them
+    tag_ids = list(resolve_tag_ids(names, create=False).values())
+    for chunk in chunked(ids, 500):
+        unlink_tags(user_id, chunk, tag_ids)
+
+
+def run_batch(user_id, operations):
+    """
+    Apply parsed operations in order; the caller commits. Returns one
+    result per operation with a status for every requested id.
+    """
+    results = []
+    for op in operations:
+        owned = _owned(user_id, op['ids'])
+        found = [b for b in op['ids'] if b in owned]
+        if found:
+            if op['op'] == 'archive':
+                _set_archived(user_id, found, True)
+            elif op['op'] == 'unarchive':
+                _set_archived(user_id, found, False)
+            elif op['op'] == 'delete':
+                _delete(user_id, found)
+            elif op['op'] == 'add_tags':
+                _add_tags(user_id, found, op['tags'])
+            elif op['op'] == 'remove_tags':
+                _remove_tags(user_id, found, op['tags'])
+        results.append({
+            'op': op['op'],
+            'results': [
+                {'id': b, 'status': STATUS_OK if b in owned else STATUS_NOT_FOUND}
+                for b in op['ids']
+            ]
+        })
+    return results
@@ -0,0 +1,19 @@
+from app import db
+
+
+def insert_ignore(table, session=None, bind=None):
+    """INSERT that silently skips rows hitting a unique/primary key, per dialect."""
+    bind = bind or (session or db.session).get_bind()
+    dialect = bind.dialect.name
+    if dialect == 'mysql':
+        return db.insert(table).prefix_with('IGNORE')
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table).on_conflict_do_nothing()
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
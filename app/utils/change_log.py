@@ -0,0 +1,87 @@
+"""
+Per-user change log behind GET /api/sync.
+
+Writers record which (user, bookmark) pairs a transaction changed;
+app.utils.user_stats bumps each user's version at commit and hands the new
+versions to write_changes, which stamps the pairs with them. The table keeps
+one row per pair, so it never grows past the bookmarks a user has ever held.
+"""
+from datetime import datetime
+from app import db
+from app.models.bookmark_change import BookmarkChange
+
+CHANGES_KEY = 'bookmark_changes'
+
+
+def record_changes(user_id, bookmark_ids, deleted=False, session=None):
+    session = session or db.session
+    changes = session.info.setdefault(CHANGES_KEY, {})
+    for bookmark_id in bookmark_ids:
+        changes[(user_id, bookmark_id)] = deleted
+
+
+def pop_changes(session):
+    return session.info.pop(CHANGES_KEY, None) or {}
+
+
+def write_changes(session, changes, versions):
+    """Upsert change rows; `versions` maps user_id -> version of this commit."""
+    rows = [
+        {'user_id': u, 'bookmark_id': b, 'seq': versions[u], 'deleted': deleted, 'changed_at': datetime.utcnow()}
+        for (u, b), deleted in changes.items() if u in versions
+    ]
+    if not rows:
+        return
+
+    table = BookmarkChange.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update(
+            seq=stmt.inserted.seq, deleted=stmt.inserted.deleted, changed_at=stmt.inserted.changed_at
+        )
+    else:
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.bookmark_id],
+            set_={'seq': stmt.excluded.seq, 'deleted': stmt.excluded.deleted, 'changed_at': stmt.excluded.changed_at}
+        )
+    session.execute(stmt, rows)
+
+
+def _discard(session, *args):
+    session.info.pop(CHANGES_KEY, None)
+
+
+def changes_since(user_id, seq, after_bookmark_id, limit):
+    """
+    Change rows after (seq, after_bookmark_id), or after all of `seq` when
+    after_bookmark_id is None, oldest first. Returns (rows, has_more);
+    rows are (bookmark_id, seq, deleted).
+    """
+    position = BookmarkChange.seq > seq
+    if after_bookmark_id is not None:
+        position = db.or_(
+            position,
+            db.and_(BookmarkChange.seq == seq, BookmarkChange.bookmark_id > after_bookmark_id)
+        )
+    query = (
+        db.select(BookmarkChange.bookmark_id, BookmarkChange.seq, BookmarkChange.deleted)
+        .where(BookmarkChange.user_id == user_id, position)
+        .order_by(BookmarkChange.seq, BookmarkChange.bookmark_id)
+        .limit(limit + 1)
+    )
+    rows = db.session.execute(query).all()
+    return rows[:limit], len(rows) > limit
+
+
+def init_app(app):
+    from sqlalchemy import event
+
+    if not event.contains(db.session, 'after_rollback', _discard):
+        event.listen(db.session, 'after_rollback', _discard)
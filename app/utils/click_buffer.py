@@ -0,0 +1,118 @@
+import atexit
+import threading
+from datetime import datetime
+
+
+class ClickBuffer:
+    """
+    Collects redirect clicks in memory and writes them to the bookmark table
+    in batches, either every CLICK_FLUSH_INTERVAL seconds or once
+    CLICK_FLUSH_THRESHOLD clicks are pending, whichever comes first.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.flush_interval = 5.0
+        self.flush_threshold = 1000
+        self._pending = {}          # bookmark_id -> [clicks, last_visited_at]
+        self._pending_clicks = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._exit_hook = False
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = app.config.get('CLICK_FLUSH_INTERVAL', self.flush_interval)
+        self.flush_threshold = app.config.get('CLICK_FLUSH_THRESHOLD', self.flush_threshold)
+        app.extensions['click_buffer'] = self
+        # graceful shutdown: write out whatever is still buffered. Registered once per
+        # process; create_app() runs many times in tests and benchmarks
+        if not self._exit_hook:
+            atexit.register(self.flush)
+            self._exit_hook = True
+
+    def record(self, bookmark_id):
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._pending.get(bookmark_id)
+            if entry is None:
+                self._pending[bookmark_id] = [1, now]
+            else:
+                entry[0] += 1
+                entry[1] = now
+            self._pending_clicks += 1
+            full = self._pending_clicks >= self.flush_threshold
+        self._ensure_flusher()
+        if full:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return self._pending_clicks
+
+    def flush(self):
+        """Write buffered clicks with one executemany UPDATE. Returns rows updated."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._pending_clicks = 0
+        if not batch or self.app is None:
+            return 0
+
+        from sqlalchemy import bindparam, update
+        from app import db
+        from app.models.bookmark import Bookmark
+
+        table = Bookmark.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam('b_id'))
+            .values(
+                click_count=table.c.click_count + bindparam('clicks'),
+                last_visited_at=bindparam('visited_at')
+            )
+        )
+        rows = [
+            {'b_id': bookmark_id, 'clicks': clicks, 'visited_at': visited_at}
+            for bookmark_id, (clicks, visited_at) in batch.items()
+        ]
+
+        with self.app.app_context():
+            try:
+                # click counters are left out of user_stats.version (see app.utils.http_cache)
+                db.session.execute(stmt, rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception('click flush failed, keeping %d bookmarks buffered', len(rows))
+                self._restore(batch)
+                return 0
+        return len(rows)
+
+    def _restore(self, batch):
+        with self._lock:
+            for bookmark_id, (clicks, visited_at) in batch.items():
+                entry = self._pending.get(bookmark_id)
+                if entry is None:
+                    self._pending[bookmark_id] = [clicks, visited_at]
+                else:
+                    entry[0] += clicks
+                    entry[1] = max(entry[1], visited_at)
+                self._pending_clicks += clicks
+
+    def _ensure_flusher(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, name='click-flusher', daemon=True)
+                self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+click_buffer = ClickBuffer()
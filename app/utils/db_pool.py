@@ -0,0 +1,220 @@
+"""
+Connection pool settings and pool metrics.
+
+engine_options() turns the DB_* settings into SQLALCHEMY_ENGINE_OPTIONS, so
+the pool can be sized per deployment from the environment. PoolMetrics
+times every checkout: how long a caller waited for a connection (the part
+that grows when the pool is exhausted) and how long it held it.
+"""
+import os
+import threading
+import time
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+ENVIRON_KEY = 'linkvault.pool_totals'
+
+# upper bounds (ms) of the checkout wait / hold histograms
+BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def engine_options(config):
+    """Engine options for the configured database; the pool sizing is skipped on SQLite."""
+    uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+    backend = uri.split(':', 1)[0].split('+', 1)[0]
+    options = {'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)}
+    if backend == 'sqlite':
+        # SQLite's default pools do not take size / overflow; the timeout is the busy wait
+        options['connect_args'] = {'timeout': config.get('DB_POOL_TIMEOUT', 10)}
+        return options
+
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=config.get('DB_POOL_SIZE', 10),
+        max_overflow=config.get('DB_MAX_OVERFLOW', 20),
+        pool_timeout=config.get('DB_POOL_TIMEOUT', 10),
+        pool_recycle=config.get('DB_POOL_RECYCLE', 1800),
+        pool_use_lifo=True,
+    )
+    connect_timeout = config.get('DB_CONNECT_TIMEOUT', 10)
+    statement_timeout = config.get('DB_STATEMENT_TIMEOUT_MS', 0)
+    if backend == 'mysql':
+        connect_args = {'connect_timeout': connect_timeout}
+        if statement_timeout:
+            # max_execution_time only bounds SELECTs; the read timeout catches the rest
+            connect_args['init_command'] = f'SET SESSION max_execution_time={int(statement_timeout)}'
+            connect_args['read_timeout'] = max(1, -(-int(statement_timeout) // 1000) + 5)
+    elif backend == 'postgresql':
+        connect_args = {'connect_timeout': connect_timeout}
+        if statement_timeout:
+            connect_args['options'] = f'-c statement_timeout={int(statement_timeout)}'
+    else:
+        connect_args = {}
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeout:
+            pool_metrics.observe_timeout(time.perf_counter() - start)
+            raise
+        pool_metrics.observe_wait(time.perf_counter() - start)
+        return conn
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, ms):
+        for i, bound in enumerate(self.buckets):
+            if ms <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.total += ms
+        self.count += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total, 3),
+            'buckets': dict(zip([*self.buckets, '+Inf'], self.counts)),
+        }
+
+
+class PoolMetrics:
+    """Process-wide checkout counters plus per-request totals in the WSGI environ."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait = Histogram()
+        self.hold = Histogram()
+        self.slow_ms = 100.0
+        self.engine = None
+        self.app = None
+        self._fork_hook = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.slow_ms = app.config.get('DB_POOL_SLOW_CHECKOUT_MS', self.slow_ms)
+        with app.app_context():
+            from app import db
+            self.engine = db.engine
+        self._register_listeners(self.engine)
+        app.before_request(self._start_request)
+        app.teardown_request(self._end_request)
+        app.extensions['pool_metrics'] = self
+
+        # gunicorn --preload forks after the engine exists; children must not share its sockets.
+        # Registered once per process, create_app() runs many times in tests and benchmarks
+        if hasattr(os, 'register_at_fork') and not self._fork_hook:
+            os.register_at_fork(after_in_child=self._after_fork)
+            self._fork_hook = True
+
+    def _after_fork(self):
+        if self.engine is not None:
+            self.engine.dispose(close=False)
+
+    def _register_listeners(self, engine):
+        if event.contains(engine, 'checkout', self._on_checkout):
+            return
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def _request_totals(self):
+        if has_request_context():
+            return request.environ.get(ENVIRON_KEY)
+        return None
+
+    def observe_wait(self, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            self.wait.observe(ms)
+        totals = self._request_totals()
+        if totals is not None:
+            totals['wait_ms'] += ms
+
+    def observe_timeout(self, seconds):
+        with self._lock:
+            self.timeouts += 1
+            self.wait.observe(seconds * 1000)
+
+    def _on_checkout(self, dbapi_conn, record, proxy):
+        record.info['checked_out_at'] = time.perf_counter()
+        with self._lock:
+            self.checkouts += 1
+        totals = self._request_totals()
+        if totals is not None:
+            totals['checkouts'] += 1
+
+    def _on_checkin(self, dbapi_conn, record):
+        started = record.info.pop('checked_out_at', None)
+        if started is None:
+            return
+        ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.hold.observe(ms)
+        totals = self._request_totals()
+        if totals is not None:
+            totals['hold_ms'] += ms
+
+    def _on_connect(self, dbapi_conn, record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_conn, record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def _start_request(self):
+        request.environ[ENVIRON_KEY] = {'checkouts': 0, 'wait_ms': 0.0, 'hold_ms': 0.0}
+
+    def _end_request(self, exc):
+        totals = request.environ.pop(ENVIRON_KEY, None)
+        if totals and totals['wait_ms'] >= self.slow_ms:
+            self.app.logger.warning(
+                'waited %.1f ms for %d database connection(s); pool %s',
+                totals['wait_ms'], totals['checkouts'], self.engine.pool.status()
+            )
+
+    def request_totals(self):
+        """This request's checkouts and wait / hold time so far, or None outside a request."""
+        return self._request_totals()
+
+    def stats(self):
+        pool = self.engine.pool if self.engine is not None else None
+        with self._lock:
+            data = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'wait': self.wait.to_dict(),
+                'hold': self.hold.to_dict(),
+            }
+        if isinstance(pool, QueuePool):
+            data.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        return data
+
+
+pool_metrics = PoolMetrics()
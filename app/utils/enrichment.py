@@ -0,0 +1,166 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+
+from app.utils.page_metadata import fetch_page_metadata
+
+PLACEHOLDER_TITLE = 'Untitled Link'
+
+# UserBookmark.enrichment_status values
+STATUS_PENDING = 'pending'
+STATUS_COMPLETE = 'complete'
+STATUS_FAILED = 'failed'
+STATUS_SKIPPED = 'skipped'     # queue was full, nothing fetched
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host by at least `interval` seconds."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if self.interval <= 0:
+            return
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+            if len(self._next_slot) > 10000:
+                # drop hosts whose slot has already passed
+                self._next_slot = {h: t for h, t in self._next_slot.items() if t > now}
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _is_retryable(exc):
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, requests.RequestException)
+
+
+class MetadataEnricher:
+    """
+    Background worker pool that fetches page metadata for freshly saved
+    bookmarks and fills in UserBookmark.title and the user's tags.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.async_mode = app.config.get('ENRICHMENT_ASYNC', True)
+        self.max_retries = app.config.get('ENRICHMENT_MAX_RETRIES', 3)
+        self.backoff = app.config.get('ENRICHMENT_BACKOFF', 1.0)
+        self.rate_limiter = HostRateLimiter(app.config.get('ENRICHMENT_HOST_INTERVAL', 1.0))
+
+        workers = app.config.get('ENRICHMENT_WORKERS', 4)
+        max_pending = app.config.get('ENRICHMENT_MAX_PENDING', 1000)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        if self.async_mode:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='enrichment')
+        app.extensions['enrichment'] = self
+
+    def reserve(self):
+        """Claim a queue slot before committing; False means the queue is full."""
+        if not self.async_mode:
+            return True
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        if self.async_mode:
+            self._slots.release()
+
+    def submit(self, user_id, bookmark_id, url, need_title, need_tags):
+        """Queue a job for a slot obtained with reserve() (runs inline when async is off)."""
+        job = (user_id, bookmark_id, url, need_title, need_tags)
+        if not self.async_mode:
+            self._run(*job)
+            return
+        self._executor.submit(self._run_and_release, *job)
+
+    def _run_and_release(self, *job):
+        try:
+            self._run(*job)
+        finally:
+            self._slots.release()
+
+    def fetch_with_retry(self, url, etag=None, last_modified=None):
+        # inline mode runs on the request thread: one attempt, no host spacing or backoff sleeps
+        retries = self.max_retries if self.async_mode else 0
+        for attempt in range(retries + 1):
+            if self.async_mode:
+                self.rate_limiter.wait(url)
+            try:
+                return fetch_page_metadata(url, etag=etag, last_modified=last_modified)
+            except Exception as exc:
+                if attempt == retries or not _is_retryable(exc):
+                    raise
+                # exponential backoff with jitter
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random() / 2))
+
+    def _run(self, user_id, bookmark_id, url, need_title, need_tags):
+        from app import db
+        from app.utils.metadata_cache import load_metadata
+
+        with self.app.app_context():
+            try:
+                try:
+                    meta = load_metadata(url, self.fetch_with_retry)
+                except Exception:
+                    db.session.rollback()
+                    meta = None
+                apply_metadata(user_id, bookmark_id, meta, need_title, need_tags)
+            except Exception:
+                self.app.logger.exception('metadata enrichment failed for bookmark %s', bookmark_id)
+                db.session.rollback()
+
+
+def apply_metadata(user_id, bookmark_id, meta, need_title, need_tags):
+    from app import db
+    from app.models.user_bookmark import UserBookmark
+    from app.models.tag_user_bookmark import tag_user_bookmarks
+    from app.utils.tags import tag_bookmarks
+
+    ub = db.session.get(UserBookmark, (user_id, bookmark_id))
+    if ub is None:
+        # removed before the worker got to it
+        return
+
+    if meta is None:
+        ub.enrichment_status = STATUS_FAILED
+        db.session.commit()
+        return
+
+    # don't clobber a title the user set while we were fetching
+    if need_title and meta['title'] and ub.title == PLACEHOLDER_TITLE:
+        ub.title = meta['title'][:255]
+
+    if need_tags and meta['keywords']:
+        has_tags = db.session.execute(
+            db.select(tag_user_bookmarks.c.tag_id).where(
+                tag_user_bookmarks.c.user_id == user_id,
+                tag_user_bookmarks.c.bookmark_id == bookmark_id
+            ).limit(1)
+        ).first()
+        if not has_tags:
+            tag_bookmarks(user_id, [bookmark_id], meta['keywords'])
+
+    ub.enrichment_status = STATUS_COMPLETE
+    db.session.commit()
+
+
+enrichment = MetadataEnricher()
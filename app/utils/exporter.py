@@ -0,0 +1,365 @@
+"""
+Streaming export of a user's bookmarks as Netscape HTML, JSON lines or CSV.
+
+All formats share one pipeline: a single joined query over the user's
+bookmarks and their tags, read with yield_per and folded into one record
+per bookmark, then rendered into chunks for a streaming Response.
+"""
+import csv
+import io
+import json
+from calendar import timegm
+from html import escape
+from itertools import groupby
+from urllib.parse import urljoin
+from app import db
+from app.models.bookmark import Bookmark
+from app.models.tag import Tag
+from app.models.user_bookmark import UserBookmark
+from app.models.tag_user_bookmark import tag_user_bookmarks
+
+FORMATS = {
+    'html': ('text/html', 'html'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+}
+CSV_FIELDS = ['url', 'title', 'notes', 'tags', 'archived', 'created_at', 'short_url']
+
+# rows fetched per round trip, and records rendered per yielded chunk
+YIELD_PER = 1000
+CHUNK_RECORDS = 200
+
+HTML_HEAD = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+                <META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+                <TITLE>LinkVault Export</TITLE>
+
+            <style>
+            * {
+                margin: 0;
+                padding: 0;
+                box-sizing: border-box;
+            }
+
+            body {
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Roboto', 'Oxygen', 'Ubuntu', 'Cantarell', sans-serif;
+                background: #000000;
+                background-image: radial-gradient(circle at 20% 50%, rgba(180, 255, 57, 0.05) 0%, transparent 50%),
+                                radial-gradient(circle at 80% 80%, rgba(193, 227, 40, 0.05) 0%, transparent 50%);
+                min-height: 100vh;
+                padding: 48px 20px;
+                line-height: 1.6;
+                color: #ffffff;
+            }
+
+            .container {
+                max-width: 1152px;
+                margin: 0 auto;
+            }
+
+            .header-section {
+                margin-bottom: 32px;
+                padding-bottom: 24px;
+                border-bottom: 1px solid #1f1f1f;
+            }
+
+            .header-title {
+                font-size: 42px;
+                font-weight: 700;
+                color: #b4ff39;
+                margin-bottom: 8px;
+                letter-spacing: -0.5px;
+            }
+
+            .header-subtitle {
+                color: #9ca3af;
+                font-size: 16px;
+                font-weight: 400;
+            }
+
+            DL {
+                display: block;
+                width: 100%;
+            }
+
+            DT {
+                margin-bottom: 24px;
+            }
+
+            .bookmark-card {
+                display: block;
+                background: #111111;
+                border: 1px solid #1f1f1f;
+                border-radius: 16px;
+                padding: 24px;
+                margin-bottom: 24px;
+                text-decoration: none;
+                transition: all 0.3s ease;
+                backdrop-filter: blur(8px);
+            }
+
+            .bookmark-card:hover {
+                border-color: rgba(193, 227, 40, 0.6);
+                box-shadow: 0 0 15px rgba(193, 227, 40, 0.15);
+                transform: translateY(-2px);
+            }
+
+            .bookmark-title {
+                font-size: 24px;
+                font-weight: 600;
+                color: #ffffff;
+                margin-bottom: 12px;
+                display: block;
+            }
+
+            .bookmark-url {
+                color: #9ca3af;
+                font-size: 16px;
+                word-break: break-all;
+                display: block;
+                margin-bottom: 8px;
+                text-decoration: none;
+            }
+
+            .bookmark-url:hover {
+                color: #c1e328;
+            }
+
+            .bookmark-url::before {
+                content: "🔗 ";
+            }
+
+            .bookmark-tags {
+                display: flex;
+                flex-wrap: wrap;
+                gap: 8px;
+                margin-top: 12px;
+            }
+
+            .tag {
+                background: #263a19;
+                color: #b4ff39;
+                padding: 4px 12px;
+                border-radius: 9999px;
+                font-size: 14px;
+                font-weight: 500;
+            }
+
+            DD {
+                background: rgba(17, 17, 17, 0.6);
+                padding: 16px 24px;
+                border-radius: 12px;
+                font-size: 14px;
+                color: #d1d5db;
+                line-height: 1.6;
+                border-left: 3px solid #263a19;
+                margin-bottom: 24px;
+                margin-left: 0;
+            }
+
+            DD::before {
+                content: "Notes: ";
+                color: #9ca3af;
+                font-weight: 600;
+            }
+
+            .timestamp {
+                font-size: 12px;
+                color: #6b7280;
+                margin-top: 8px;
+            }
+
+            /* Responsive design */
+            @media (max-width: 768px) {
+                body {
+                    padding: 24px 16px;
+                }
+
+                .header-title {
+                    font-size: 32px;
+                }
+
+                .bookmark-card {
+                    padding: 20px;
+                }
+
+                .bookmark-title {
+                    font-size: 20px;
+                }
+            }
+
+            /* Print styles */
+            @media print {
+                body {
+                    background: white;
+                    color: black;
+                }
+
+                .header-title {
+                    color: #000000;
+                }
+
+                .bookmark-card {
+                    background: white;
+                    border: 1px solid #e5e7eb;
+                    box-shadow: none;
+                }
+
+                .bookmark-card:hover {
+                    transform: none;
+                }
+
+                .bookmark-title {
+                    color: #000000;
+                }
+
+                .tag {
+                    background: #e5e7eb;
+                    color: #000000;
+                }
+
+                DD {
+                    background: #f3f4f6;
+                    color: #000000;
+                }
+            }
+        </style>
+"""
+
+HTML_HEADER = """
+<div class="container">
+    <div class="header-section">
+        <h1 class="header-title">Your Bookmarks</h1>
+        <p class="header-subtitle">Exported on {exported_on}</p>
+    </div>
+    <DL><p>
+"""
+
+HTML_FOOTER = """    </DL></p>
+</div>"""
+
+
+def iter_export_records(user_id):
+    """
+    Yield one dict per bookmark of the user, newest first, with its tags.
+    The join returns a row per (bookmark, tag); rows of the same bookmark
+    are adjacent thanks to the ORDER BY, so they are folded with groupby.
+    """
+    query = (
+        db.select(
+            UserBookmark.bookmark_id, Bookmark.url, Bookmark.short_url,
+            UserBookmark.title, UserBookmark.notes, UserBookmark.archived,
+            UserBookmark.created_at, Tag.name.label('tag')
+        )
+        .join(Bookmark, Bookmark.id == UserBookmark.bookmark_id)
+        .outerjoin(tag_user_bookmarks, db.and_(
+            tag_user_bookmarks.c.bookmark_id == UserBookmark.bookmark_id,
+            tag_user_bookmarks.c.user_id == UserBookmark.user_id
+        ))
+        .outerjoin(Tag, Tag.id == tag_user_bookmarks.c.tag_id)
+        .where(UserBookmark.user_id == user_id)
+        .order_by(UserBookmark.created_at.desc(), UserBookmark.bookmark_id.desc(), Tag.name)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    rows = db.session.execute(query)
+    for _, group in groupby(rows, key=lambda r: r.bookmark_id):
+        first = next(group)
+        tags = [first.tag] if first.tag else []
+        tags.extend(r.tag for r in group if r.tag)
+        yield {
+            'url': first.url,
+            'short_url': first.short_url,
+            'title': first.title or first.url,
+            'notes': first.notes or '',
+            'archived': bool(first.archived),
+            'created_at': first.created_at,
+            'tags': tags,
+        }
+
+
+def _chunks(records, render):
+    buf = []
+    for record in records:
+        buf.append(render(record))
+        if len(buf) >= CHUNK_RECORDS:
+            yield ''.join(buf)
+            buf = []
+    if buf:
+        yield ''.join(buf)
+
+
+def _html_record(record):
+    url = escape(record['url'])
+    tags = record['tags']
+    add_date = timegm(record['created_at'].timetuple()) if record['created_at'] else ''
+    out = [
+        f'    <DT><A HREF="{url}" ADD_DATE="{add_date}" TAGS="{escape(",".join(tags))}" class="bookmark-card">\n',
+        f'        <span class="bookmark-title">{escape(record["title"], quote=False)}</span>\n',
+        f'        <span class="bookmark-url">{url}</span>\n',
+    ]
+    if tags:
+        out.append('        <div class="bookmark-tags">\n')
+        out.extend(f'            <span class="tag">{escape(t, quote=False)}</span>\n' for t in tags)
+        out.append('        </div>\n')
+    out.append('    </A></DT>\n')
+    if record['notes']:
+        out.append(f'    <DD>{escape(record["notes"], quote=False)}\n')
+    return ''.join(out)
+
+
+def _json_record(record, short_base):
+    return json.dumps({
+        'url': record['url'],
+        'title': record['title'],
+        'notes': record['notes'],
+        'tags': record['tags'],
+        'archived': record['archived'],
+        'created_at': record['created_at'].isoformat() if record['created_at'] else None,
+        'short_url': urljoin(short_base, record['short_url']),
+    }, ensure_ascii=False) + '\n'
+
+
+def _csv_row(record, short_base):
+    return [
+        record['url'], record['title'], record['notes'], ','.join(record['tags']),
+        int(record['archived']),
+        record['created_at'].isoformat() if record['created_at'] else '',
+        urljoin(short_base, record['short_url']),
+    ]
+
+
+def export_html(user_id, exported_on):
+    yield HTML_HEAD + HTML_HEADER.format(exported_on=exported_on)
+    yield from _chunks(iter_export_records(user_id), _html_record)
+    yield HTML_FOOTER
+
+
+def export_jsonl(user_id, short_base):
+    yield from _chunks(iter_export_records(user_id), lambda r: _json_record(r, short_base))
+
+
+def _drain(buf):
+    text = buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    return text
+
+
+def export_csv(user_id, short_base):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_FIELDS)
+    yield _drain(buf)
+
+    def render(record):
+        writer.writerow(_csv_row(record, short_base))
+        return _drain(buf)
+
+    yield from _chunks(iter_export_records(user_id), render)
+
+
+def export_chunks(fmt, user_id, short_base, exported_on):
+    if fmt == 'jsonl':
+        return export_jsonl(user_id, short_base)
+    if fmt == 'csv':
+        return export_csv(user_id, short_base)
+    return export_html(user_id, exported_on)
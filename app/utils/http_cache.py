@@ -0,0 +1,89 @@
+"""
+Conditional GETs for per-user views.
+
+Responses carry a weak ETag built from the user's change version (kept on
+user_stats) plus a Last-Modified from the same row, so a revalidation only
+reads that one row and answers 304 without touching the bookmark tables.
+
+Click counters (click_count, last_visited_at) are not covered by the version:
+bumping it on every click flush would invalidate the ETag of every user who
+holds a popular bookmark. A 304 can leave the client with older counters, which
+is what the weak validator allows; they are current again on the next change.
+"""
+from functools import wraps
+from flask import request, make_response
+from flask_login import current_user
+from app.utils.user_stats import get_user_stats
+
+
+def wants_json():
+    return request.is_json or 'application/json' in request.headers.get('Accept', '')
+
+
+def _expected_kind(always_json):
+    # what the view is about to send, for checking the client's validator
+    if always_json or wants_json() or request.args.get('format') == 'json':
+        return 'json'
+    return 'html'
+
+
+def _kind(response):
+    return 'json' if response.mimetype == 'application/json' else 'html'
+
+
+def _etag(stats, kind):
+    # html and json variants of the same url are different representations
+    return f'{stats.user_id}.{stats.version}.{kind}'
+
+
+def _is_fresh(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def _add_headers(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    # always revalidate; the browser may keep a copy but must ask first
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Accept')
+    response.vary.add('Cookie')
+    return response
+
+
+def user_conditional(view=None, *, require_user_id=False, always_json=False):
+    """
+    Answer 304 when the current user's bookmarks haven't changed since the client's copy.
+
+    require_user_id: the view only shows the current user's data when ?user_id= names
+    them; without it the body can depend on other users, so it is passed through.
+    always_json: the view answers JSON whatever the Accept header says.
+    """
+    if view is None:
+        return lambda v: user_conditional(v, require_user_id=require_user_id, always_json=always_json)
+
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        # the version only tracks the current user's data
+        requested = request.args.get('user_id', type=int)
+        if requested is None and require_user_id:
+            return view(*args, **kwargs)
+        if requested is not None and requested != current_user.id:
+            return view(*args, **kwargs)
+
+        stats = get_user_stats(current_user.id)
+        last_modified = stats.updated_at
+        etag = _etag(stats, _expected_kind(always_json))
+        if _is_fresh(etag, last_modified):
+            return _add_headers(make_response('', 304), etag, last_modified)
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            # label the copy with what was actually sent
+            _add_headers(response, _etag(stats, _kind(response)), last_modified)
+        return response
+    return wrapped
@@ -0,0 +1,360 @@
+"""
+Streaming bulk import of Netscape bookmark HTML and JSON lines.
+
+Records are parsed incrementally from the upload and written in batches:
+one IN query to dedupe against Bookmark.hash_url, bulk inserts for new
+bookmarks / user bookmarks / tags, and one commit per batch.
+"""
+import codecs
+import json
+import os
+from datetime import datetime
+from html.parser import HTMLParser
+from app import db
+from app.models.bookmark import Bookmark, normalize_url, generate_url_hash
+from app.models.user_bookmark import UserBookmark
+from app.utils import search_index
+from app.utils.bulk import insert_ignore
+from app.utils.short_codes import short_codes
+from app.utils.tag_counter import link_tags
+from app.utils.tags import clean_tag_names, resolve_tag_ids
+from app.utils.user_stats import add_stats_delta
+from app.utils.change_log import record_changes
+
+READ_SIZE = 64 * 1024
+FORMATS = ('html', 'jsonl')
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+# ----------------------------------------------------------------------
+# Parsing
+# ----------------------------------------------------------------------
+class NetscapeParser(HTMLParser):
+    """
+    Incremental parser for the Netscape bookmark format. Completed records
+    accumulate in `records`; a record is held back until we know whether a
+    <DD> description follows its <A>.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.records = []
+        self.count = 0
+        self._current = None
+        self._text = []
+        self._title_span = None
+        self._in_title_span = False
+        self._last = None
+        self._notes = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'a':
+            self._flush()
+            self.count += 1
+            self._current = {
+                'row': self.count,
+                'url': attrs.get('href'),
+                'add_date': attrs.get('add_date'),
+                'tags': attrs.get('tags') or '',
+            }
+            self._text = []
+            self._title_span = None
+        elif tag == 'span' and self._current is not None and 'bookmark-title' in (attrs.get('class') or ''):
+            # LinkVault's own export wraps the title in a span next to the url and tags
+            self._in_title_span = True
+            self._title_span = []
+        elif tag == 'dd' and self._last is not None:
+            self._notes = []
+        elif tag in ('dt', 'dl', 'h3'):
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag == 'a' and self._current is not None:
+            parts = self._title_span if self._title_span is not None else self._text
+            self._current['title'] = ' '.join(''.join(parts).split())
+            self._last = self._current
+            self._current = None
+        elif tag == 'span':
+            self._in_title_span = False
+        elif tag == 'dl':
+            self._flush()
+
+    def handle_data(self, data):
+        if self._current is not None:
+            self._text.append(data)
+            if self._in_title_span:
+                self._title_span.append(data)
+        elif self._notes is not None:
+            self._notes.append(data)
+
+    def _flush(self):
+        if self._last is not None:
+            if self._notes is not None:
+                self._last['notes'] = ''.join(self._notes).strip()
+            self.records.append(self._last)
+        self._last = None
+        self._notes = None
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def iter_html_records(stream):
+    parser = NetscapeParser()
+    decoder = codecs.getincrementaldecoder('utf-8')('replace')
+    while True:
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            break
+        parser.feed(decoder.decode(chunk))
+        if parser.records:
+            yield from parser.records
+            parser.records = []
+    parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+    yield from parser.records
+
+
+def iter_jsonl_records(stream):
+    row = 0
+    while True:
+        line = stream.readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError
+        except ValueError:
+            yield {'row': row, 'error': 'invalid JSON object'}
+            continue
+        record['row'] = row
+        yield record
+
+
+def detach_upload(upload):
+    """
+    Reopen an uploaded file on its own descriptor. Flask closes request.files
+    when the view returns, but the import keeps reading from a streamed
+    response after that; the caller closes the returned file.
+    """
+    detached = os.fdopen(os.dup(upload.stream.fileno()), 'rb')
+    detached.seek(0)
+    return detached
+
+
+def iter_records(stream, fmt):
+    return iter_html_records(stream) if fmt == 'html' else iter_jsonl_records(stream)
+
+
+def detect_format(fmt=None, filename=None, mimetype=None):
+    if fmt:
+        return fmt if fmt in FORMATS else None
+    name = (filename or '').lower()
+    if name.endswith(('.html', '.htm')):
+        return 'html'
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if mimetype == 'text/html':
+        return 'html'
+    if mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json'):
+        return 'jsonl'
+    return None
+
+
+# ----------------------------------------------------------------------
+# Cleaning
+# ----------------------------------------------------------------------
+def _parse_tags(value):
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list):
+        raise ImportRowError('tags must be a list or comma-separated string')
+    return clean_tag_names(value)
+
+
+def _parse_archived(value):
+    # bool("false") is True; only take values that say what they mean
+    if value is None or isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false', '1', '0'):
+        return value.strip().lower() in ('true', '1')
+    raise ImportRowError('archived must be true/false or 1/0')
+
+
+def _parse_created(record):
+    if record.get('add_date'):
+        try:
+            return datetime.utcfromtimestamp(int(record['add_date']))
+        except (TypeError, ValueError, OverflowError, OSError):
+            raise ImportRowError('invalid ADD_DATE')
+    if record.get('created_at'):
+        try:
+            return datetime.fromisoformat(str(record['created_at']).rstrip('Z')).replace(tzinfo=None)
+        except ValueError:
+            raise ImportRowError('invalid created_at')
+    return None
+
+
+def clean_record(record):
+    url = (record.get('url') or '').strip()
+    if not url:
+        raise ImportRowError('url required')
+    if not url.startswith(('http://', 'https://')):
+        raise ImportRowError('only http(s) urls can be imported')
+    norm_url = normalize_url(url)
+    if len(norm_url) > 255:
+        raise ImportRowError('url longer than 255 characters')
+
+    return {
+        'url': norm_url,
+        'hash_url': generate_url_hash(norm_url),
+        'title': ((record.get('title') or '').strip() or norm_url)[:255],
+        'notes': str(record.get('notes') or ''),
+        'archived': _parse_archived(record.get('archived')),
+        'created_at': _parse_created(record),
+        'tags': _parse_tags(record.get('tags') or []),
+    }
+
+
+# ----------------------------------------------------------------------
+# Writing
+# ----------------------------------------------------------------------
+def _bookmark_ids(hashes):
+    return dict(db.session.execute(
+        db.select(Bookmark.hash_url, Bookmark.id).where(Bookmark.hash_url.in_(hashes))
+    ).all())
+
+
+def import_batch(user_id, records):
+    """Write one batch; returns (imported, skipped, errors). Caller commits."""
+    errors = []
+    skipped = 0
+    rows = {}
+    for record in records:
+        if record.get('error'):
+            errors.append({'row': record['row'], 'error': record['error']})
+            continue
+        try:
+            clean = clean_record(record)
+        except ImportRowError as e:
+            errors.append({'row': record['row'], 'url': record.get('url'), 'error': str(e)})
+            continue
+        if clean['hash_url'] in rows:
+            skipped += 1        # same link twice in the file
+            continue
+        clean['row'] = record['row']
+        rows[clean['hash_url']] = clean
+
+    if not rows:
+        return 0, skipped, errors
+
+    # shared Bookmark rows: reuse existing, bulk insert the rest
+    ids = _bookmark_ids(list(rows))
+    missing = [h for h in rows if h not in ids]
+    if missing:
+        codes = short_codes.allocate(len(missing))
+        db.session.execute(insert_ignore(Bookmark.__table__), [
+            {'url': rows[h]['url'], 'hash_url': h, 'short_url': code}
+            for h, code in zip(missing, codes)
+        ])
+        ids.update(_bookmark_ids(missing))
+
+    already_saved = set(db.session.execute(
+        db.select(UserBookmark.bookmark_id).where(
+            UserBookmark.user_id == user_id,
+            UserBookmark.bookmark_id.in_(list(ids.values()))
+        )
+    ).scalars())
+
+    new_rows = []
+    for h, clean in rows.items():
+        bookmark_id = ids.get(h)
+        if bookmark_id is None:
+            errors.append({'row': clean['row'], 'url': clean['url'], 'error': 'could not create bookmark'})
+        elif bookmark_id in already_saved:
+            skipped += 1
+        else:
+            clean['bookmark_id'] = bookmark_id
+            new_rows.append(clean)
+
+    if not new_rows:
+        return 0, skipped, errors
+
+    ub_rows = []
+    for r in new_rows:
+        ub = {
+            'user_id': user_id,
+            'bookmark_id': r['bookmark_id'],
+            'title': r['title'],
+            'notes': r['notes'],
+            'archived': r['archived'],
+        }
+        if r['created_at']:
+            ub['created_at'] = r['created_at']
+        ub_rows.append(ub)
+    # rows without created_at get the column default; split so each executemany is uniform
+    for with_date in (True, False):
+        part = [ub for ub in ub_rows if ('created_at' in ub) == with_date]
+        if part:
+            db.session.execute(db.insert(UserBookmark.__table__), part)
+
+    # bulk inserts skip mapper events, so index and count explicitly
+    add_stats_delta(user_id, len(new_rows), sum(1 for r in new_rows if r['archived']))
+    record_changes(user_id, [r['bookmark_id'] for r in new_rows])
+    search_index.index_bookmarks(db.session.connection(), [
+        {'user_id': user_id, 'bookmark_id': r['bookmark_id'], 'title': r['title'],
+         'notes': r['notes'], 'url': r['url']}
+        for r in new_rows
+    ])
+
+    tag_ids = resolve_tag_ids({t for r in new_rows for t in r['tags']})
+    link_tags([
+        {'tag_id': tag_ids[t], 'user_id': user_id, 'bookmark_id': r['bookmark_id']}
+        for r in new_rows for t in r['tags'] if t in tag_ids
+    ])
+    return len(new_rows), skipped, errors
+
+
+def import_bookmarks(user_id, records, batch_size=500):
+    """
+    Import an iterable of raw records for a user, committing every
+    `batch_size` records. Yields a progress dict after each batch and a
+    final summary with 'done': True.
+    """
+    totals = {'processed': 0, 'imported': 0, 'skipped': 0, 'failed': 0}
+    batch = []
+
+    def run(batch):
+        try:
+            imported, skipped, errors = import_batch(user_id, batch)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            imported, skipped = 0, 0
+            errors = [{'row': r.get('row'), 'url': r.get('url'), 'error': f'batch failed: {e.__class__.__name__}'} for r in batch]
+        totals['processed'] += len(batch)
+        totals['imported'] += imported
+        totals['skipped'] += skipped
+        totals['failed'] += len(errors)
+        return dict(totals, errors=errors)
+
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield run(batch)
+            batch = []
+    if batch:
+        yield run(batch)
+    yield dict(totals, done=True)
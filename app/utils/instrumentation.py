@@ -0,0 +1,308 @@
+"""
+Opt-in request instrumentation (INSTRUMENTATION_ENABLED).
+
+For every request it records wall time, the number and total time of SQL
+statements, the slowest statement, and time spent fetching pages
+(fetch_page_metadata, from the enrichment workers or inline on create). Each
+response carries the numbers in a Server-Timing header, and aggregates per
+endpoint are served in Prometheus text format at METRICS_PATH, together with
+the in-process cache and pool counters.
+Requests that issue more than INSTRUMENTATION_MAX_QUERIES statements (the
+usual N+1 signature) or run a statement slower than
+INSTRUMENTATION_SLOW_SQL_MS are logged with the offending SQL.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, abort, has_request_context, request
+from sqlalchemy import event
+from app.utils.db_pool import BUCKETS, Histogram
+
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BACKGROUND = '(background)'
+PREFIX = 'linkvault'
+# kept in the WSGI environ rather than on g: inline enrichment pushes its own app context
+ENVIRON_KEY = 'linkvault.request_stats'
+
+
+class RequestStats:
+    __slots__ = ('started', 'status', 'sql_count', 'sql_ms', 'slowest_ms', 'slowest_sql', 'http_count', 'http_ms')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.status = None
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+        self.http_count = 0
+        self.http_ms = 0.0
+
+    @property
+    def wall_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = {}          # (method, status) -> count
+        self.duration = Histogram(BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.sql_ms = 0.0
+        self.slowest_sql_ms = 0.0
+        self.http_ms = 0.0
+
+
+class Instrumentation:
+
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self.max_queries = 50
+        self.slow_sql_ms = 250.0
+        self.endpoints = {}
+        self.sql_count = {}         # endpoint -> statements, including background work
+        self.outbound = {}          # target -> Histogram
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('INSTRUMENTATION_ENABLED', False)
+        app.extensions['instrumentation'] = self
+        if not self.enabled:
+            return
+        self.max_queries = app.config.get('INSTRUMENTATION_MAX_QUERIES', self.max_queries)
+        self.slow_sql_ms = app.config.get('INSTRUMENTATION_SLOW_SQL_MS', self.slow_sql_ms)
+
+        with app.app_context():
+            from app import db
+            engine = db.engine
+        if not event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        app.before_request(self._start_request)
+        app.after_request(self._add_server_timing)
+        app.teardown_request(self._end_request)
+        app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', self._metrics_view)
+
+    # per-request state
+
+    def _current(self):
+        if has_request_context():
+            return request.environ.get(ENVIRON_KEY)
+        return None
+
+    def _start_request(self):
+        request.environ[ENVIRON_KEY] = RequestStats()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._instrumentation_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_instrumentation_started', None)
+        if started is None:
+            return
+        ms = (time.perf_counter() - started) * 1000
+        stats = self._current()
+        if stats is None:
+            with self._lock:
+                self.sql_count[BACKGROUND] = self.sql_count.get(BACKGROUND, 0) + 1
+            return
+        stats.sql_count += 1
+        stats.sql_ms += ms
+        if ms > stats.slowest_ms:
+            stats.slowest_ms = ms
+            stats.slowest_sql = statement
+
+    @contextmanager
+    def track_outbound(self, target):
+        """Time an outbound HTTP call; attributed to the current request, if any."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.outbound.setdefault(target, Histogram(BUCKETS)).observe(ms)
+            stats = self._current()
+            if stats is not None:
+                stats.http_count += 1
+                stats.http_ms += ms
+
+    def _add_server_timing(self, response):
+        stats = self._current()
+        if stats is None:
+            return response
+        stats.status = response.status_code
+        from app.utils.db_pool import pool_metrics
+
+        timings = [
+            f'app;dur={stats.wall_ms:.1f}',
+            f'db;dur={stats.sql_ms:.1f};desc="{stats.sql_count} queries"',
+            f'db-slowest;dur={stats.slowest_ms:.1f}',
+            f'http;dur={stats.http_ms:.1f};desc="{stats.http_count} fetches"',
+        ]
+        pool = pool_metrics.request_totals()
+        if pool:
+            timings.append(f"db-pool;dur={pool['wait_ms']:.1f};desc=\"{pool['checkouts']} checkouts\"")
+        response.headers.add('Server-Timing', ', '.join(timings))
+        return response
+
+    def _end_request(self, exc):
+        # runs after a streamed body has been sent, so wall time covers it
+        stats = request.environ.pop(ENVIRON_KEY, None)
+        if stats is None:
+            return
+        endpoint = request.endpoint or '(unmatched)'
+        wall_ms = stats.wall_ms
+        with self._lock:
+            ep = self.endpoints.get(endpoint)
+            if ep is None:
+                ep = self.endpoints[endpoint] = EndpointStats()
+            key = (request.method, stats.status or 500)
+            ep.requests[key] = ep.requests.get(key, 0) + 1
+            ep.duration.observe(wall_ms)
+            ep.queries.observe(stats.sql_count)
+            ep.sql_ms += stats.sql_ms
+            ep.slowest_sql_ms = max(ep.slowest_sql_ms, stats.slowest_ms)
+            ep.http_ms += stats.http_ms
+            self.sql_count[endpoint] = self.sql_count.get(endpoint, 0) + stats.sql_count
+
+        if stats.sql_count > self.max_queries:
+            self.app.logger.warning(
+                '%s %s issued %d SQL statements (%.1f ms); slowest: %s',
+                request.method, request.path, stats.sql_count, stats.sql_ms, _one_line(stats.slowest_sql)
+            )
+        elif stats.slowest_ms >= self.slow_sql_ms:
+            self.app.logger.warning(
+                '%s %s: slow SQL statement (%.1f ms): %s',
+                request.method, request.path, stats.slowest_ms, _one_line(stats.slowest_sql)
+            )
+
+    # /metrics
+
+    def _metrics_view(self):
+        token = self.app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+    def render(self):
+        out = []
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            _family(out, 'http_requests_total', 'counter', 'Requests handled, by endpoint, method and status.', [
+                ({'endpoint': name, 'method': method, 'status': status}, count)
+                for name, ep in endpoints for (method, status), count in sorted(ep.requests.items())
+            ])
+            _histogram(out, 'http_request_duration_seconds', 'Wall time per request.',
+                       [({'endpoint': name}, ep.duration) for name, ep in endpoints], scale=1000)
+            _histogram(out, 'sql_statements_per_request', 'SQL statements issued per request.',
+                       [({'endpoint': name}, ep.queries) for name, ep in endpoints])
+            _family(out, 'sql_statements_total', 'counter', 'SQL statements, by endpoint; background work has its own label.', [
+                ({'endpoint': name}, count) for name, count in sorted(self.sql_count.items())
+            ])
+            _family(out, 'sql_duration_seconds_total', 'counter', 'Time spent in SQL statements per endpoint.', [
+                ({'endpoint': name}, ep.sql_ms / 1000) for name, ep in endpoints
+            ])
+            _family(out, 'sql_slowest_statement_seconds', 'gauge', 'Slowest single SQL statement seen per endpoint.', [
+                ({'endpoint': name}, ep.slowest_sql_ms / 1000) for name, ep in endpoints
+            ])
+            _family(out, 'outbound_http_request_seconds_total', 'counter', 'Time spent in outbound HTTP per endpoint.', [
+                ({'endpoint': name}, ep.http_ms / 1000) for name, ep in endpoints
+            ])
+            _histogram(out, 'outbound_http_duration_seconds', 'Outbound HTTP calls, including background enrichment.',
+                       [({'target': target}, hist) for target, hist in sorted(self.outbound.items())], scale=1000)
+        self._render_extensions(out)
+        return '\n'.join(out) + '\n'
+
+    def _render_extensions(self, out):
+        ext = self.app.extensions
+        caches = [(name, ext[name].stats()) for name in ('short_code_cache', 'tag_resolver', 'qr_cache', 'user_cache') if name in ext]
+        _family(out, 'cache_hits_total', 'counter', 'In-process cache hits.',
+                [({'cache': name}, s['hits']) for name, s in caches])
+        _family(out, 'cache_misses_total', 'counter', 'In-process cache misses.',
+                [({'cache': name}, s['misses']) for name, s in caches])
+        _family(out, 'cache_entries', 'gauge', 'Entries held by in-process caches.',
+                [({'cache': name}, s.get('size', s.get('entries', 0))) for name, s in caches])
+        if 'qr_cache' in ext:
+            _family(out, 'qr_cache_bytes', 'gauge', 'Bytes of rendered QR images held.',
+                    [({}, ext['qr_cache'].stats()['bytes'])])
+        if 'click_buffer' in ext:
+            _family(out, 'click_buffer_pending', 'gauge', 'Redirect clicks waiting to be flushed.',
+                    [({}, ext['click_buffer'].pending())])
+        if 'short_codes' in ext:
+            s = ext['short_codes'].stats()
+            _family(out, 'short_code_block_reservations_total', 'counter', 'Short code sequence blocks reserved.',
+                    [({}, s['reservations'])])
+            _family(out, 'short_code_block_remaining', 'gauge', 'Short codes left in the current block.',
+                    [({}, s['remaining_in_block'])])
+        if 'pool_metrics' in ext:
+            s = ext['pool_metrics'].stats()
+            for key, kind, text in (
+                ('checkouts', 'counter', 'Connection pool checkouts.'),
+                ('timeouts', 'counter', 'Checkouts that timed out waiting for a connection.'),
+                ('connects', 'counter', 'New database connections opened.'),
+                ('invalidations', 'counter', 'Connections invalidated (errors, failed pre-ping).'),
+                ('checked_out', 'gauge', 'Connections currently checked out.'),
+                ('overflow', 'gauge', 'Overflow connections in use (negative while below pool size).'),
+            ):
+                if key in s:
+                    name = f'db_pool_{key}_total' if kind == 'counter' else f'db_pool_{key}'
+                    _family(out, name, kind, text, [({}, s[key])])
+            pool = ext['pool_metrics']
+            _histogram(out, 'db_pool_wait_seconds', 'Time spent waiting for a pooled connection.',
+                       [({}, pool.wait)], scale=1000)
+            _histogram(out, 'db_pool_hold_seconds', 'Time a connection stayed checked out.',
+                       [({}, pool.hold)], scale=1000)
+
+
+def _one_line(sql):
+    return ' '.join((sql or '').split())[:500]
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        f'{k}="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for k, v in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _family(out, name, kind, text, samples):
+    if not samples:
+        return
+    out.append(f'# HELP {PREFIX}_{name} {text}')
+    out.append(f'# TYPE {PREFIX}_{name} {kind}')
+    for labels, value in samples:
+        out.append(f'{PREFIX}_{name}{_labels(labels)} {_number(value)}')
+
+
+def _histogram(out, name, text, series, scale=1):
+    """`series` is [(labels, Histogram)]; bucket bounds and sums are divided by `scale`."""
+    if not series:
+        return
+    out.append(f'# HELP {PREFIX}_{name} {text}')
+    out.append(f'# TYPE {PREFIX}_{name} histogram')
+    for labels, hist in series:
+        cumulative = 0
+        for bound, count in zip([*hist.buckets, None], hist.counts):
+            cumulative += count
+            le = '+Inf' if bound is None else _number(bound / scale if scale != 1 else bound)
+            out.append(f'{PREFIX}_{name}_bucket{_labels({**labels, "le": le})} {cumulative}')
+        out.append(f'{PREFIX}_{name}_sum{_labels(labels)} {_number(hist.total / scale)}')
+        out.append(f'{PREFIX}_{name}_count{_labels(labels)} {hist.count}')
+
+
+instrumentation = Instrumentation()
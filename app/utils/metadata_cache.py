@@ -0,0 +1,59 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.bookmark import generate_url_hash
+from app.models.url_metadata import UrlMetadata
+
+
+def cache_ttl():
+    return current_app.config.get('METADATA_CACHE_TTL', 7 * 24 * 3600)
+
+
+def get_cached_metadata(hash_url):
+    """Return cached metadata for hash_url if it is still fresh, else None."""
+    row = db.session.get(UrlMetadata, hash_url)
+    if row and row.is_fresh(cache_ttl()):
+        return row.to_meta()
+    return None
+
+
+def load_metadata(url, fetch):
+    """
+    Return metadata for a normalized url, going to the origin only when the
+    cached copy is missing or expired. Expired entries are revalidated with
+    their ETag / Last-Modified; a 304 just renews the fetch timestamp.
+
+    `fetch(url, etag=..., last_modified=...)` does the actual request.
+    """
+    hash_url = generate_url_hash(url)
+    row = db.session.get(UrlMetadata, hash_url)
+    if row and row.is_fresh(cache_ttl()):
+        return row.to_meta()
+
+    etag = row.etag if row else None
+    last_modified = row.last_modified if row else None
+    # don't keep a transaction open across the network call
+    db.session.commit()
+
+    meta = fetch(url, etag=etag, last_modified=last_modified)
+
+    row = db.session.get(UrlMetadata, hash_url)
+    if meta.get('not_modified') and row is not None:
+        row.fetched_at = datetime.utcnow()
+        row.etag = meta.get('etag') or row.etag
+        row.last_modified = meta.get('last_modified') or row.last_modified
+        result = row.to_meta()
+    else:
+        if row is None:
+            row = UrlMetadata(hash_url=hash_url)
+            db.session.add(row)
+        row.update_from(meta)
+        result = meta
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # another worker cached the same URL first
+        db.session.rollback()
+    return result
@@ -0,0 +1,106 @@
+import re
+import requests
+from bs4 import BeautifulSoup
+from app.utils.instrumentation import instrumentation
+
+FETCH_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+FETCH_TIMEOUT = 6
+CHUNK_SIZE = 8192
+# metadata lives in <head>; never read more than this looking for it
+MAX_HEAD_BYTES = 512 * 1024
+
+HEAD_END = re.compile(rb'</head\s*>', re.IGNORECASE)
+
+
+def _read_head(resp):
+    """Read the response body until </head> (or the byte cap) and stop."""
+    buf = bytearray()
+    for chunk in resp.iter_content(CHUNK_SIZE):
+        if not chunk:
+            continue
+        # only rescan the tail of the previous chunk plus the new one
+        scan_from = max(0, len(buf) - 8)
+        buf.extend(chunk)
+        match = HEAD_END.search(buf, scan_from)
+        if match:
+            return bytes(buf[:match.end()]), len(buf)
+        if len(buf) >= MAX_HEAD_BYTES:
+            break
+    return bytes(buf), len(buf)
+
+
+def _header_charset(resp):
+    """The charset named in Content-Type, or None to let the document decide."""
+    # resp.encoding falls back to ISO-8859-1 for any text/* type; only trust
+    # it when the server actually sent a charset, so <meta charset> still wins
+    # over a bare Content-Type: text/html
+    if 'charset' not in resp.headers.get('Content-Type', '').lower():
+        return None
+    return resp.encoding
+
+
+def parse_page_metadata(head_html, encoding=None):
+    """
+    Pull title, keywords and description out of an HTML <head> fragment.
+    `encoding` is the charset from the response headers, if any; without it
+    BeautifulSoup sniffs <meta charset> and the bytes themselves.
+    """
+    soup = BeautifulSoup(head_html, 'html.parser', from_encoding=encoding)
+
+    title_tag = soup.find('title')
+    title = title_tag.get_text(strip=True) if title_tag else None
+
+    keywords = []
+    meta_kw = soup.find('meta', attrs={'name': re.compile('^keywords$', re.I)})
+    if meta_kw and meta_kw.get('content'):
+        # comma-separated string -> list of tags
+        keywords = [kw.strip().lower() for kw in meta_kw['content'].split(',') if kw.strip()]
+
+    description = None
+    meta_desc = soup.find('meta', attrs={'name': re.compile('^description$', re.I)})
+    if meta_desc and meta_desc.get('content'):
+        description = meta_desc['content'].strip()
+
+    return {
+        'title': title or None,
+        'keywords': keywords,
+        'description': description,
+    }
+
+
+def fetch_page_metadata(url, timeout=FETCH_TIMEOUT, etag=None, last_modified=None):
+    """
+    Fetch `url` once and return its title, keywords and description.
+    Passing the validators from a previous fetch makes the request conditional;
+    a 304 comes back as {'not_modified': True, ...} with no metadata.
+    Raises requests exceptions on network / HTTP errors.
+    """
+    headers = dict(FETCH_HEADERS)
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    with instrumentation.track_outbound('page_metadata'), \
+            requests.get(url, headers=headers, timeout=timeout, stream=True) as resp:
+        resp.raise_for_status()
+        validators = {
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+        }
+        if resp.status_code == 304:
+            return dict(validators, not_modified=True, bytes_read=0)
+        head_html, bytes_read = _read_head(resp)
+
+    meta = parse_page_metadata(head_html, encoding=_header_charset(resp))
+    meta.update(validators)
+    meta['bytes_read'] = bytes_read
+    return meta
+
+
+def extract_page_metadata(url):
+    """Like fetch_page_metadata, but returns empty metadata instead of raising."""
+    try:
+        return fetch_page_metadata(url)
+    except Exception:
+        return {'title': None, 'keywords': [], 'description': None, 'bytes_read': 0}
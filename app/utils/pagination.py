@@ -0,0 +1,150 @@
+import base64
+import json
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models.user_bookmark import UserBookmark
+
+
+# listings used to take ?page=N; silently serving page 1 to old clients would hide the change
+PAGE_PARAM_REMOVED = "'page' is no longer supported; pass the response's next_cursor as ?cursor= instead"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode(value):
+    raw = json.dumps(value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+
+
+def encode_cursor(created_at, bookmark_id):
+    return _encode([created_at.isoformat(), bookmark_id])
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, bookmark_id = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(bookmark_id)
+    except Exception:
+        raise InvalidCursor('Invalid or expired cursor')
+
+
+def decode_offset_cursor(cursor):
+    try:
+        offset = int(_decode(cursor)['o'])
+    except Exception:
+        raise InvalidCursor('Invalid or expired cursor')
+    if offset < 0:
+        raise InvalidCursor('Invalid or expired cursor')
+    return offset
+
+
+def encode_sync_token(seq, bookmark_id=None, snapshot=False):
+    """
+    Position in a user's change stream. A delta token resumes after change
+    (seq, bookmark_id), or after all of `seq` when bookmark_id is None; a
+    snapshot token resumes a full download taken at version `seq`.
+    """
+    value = {'v': seq}
+    if bookmark_id is not None:
+        value['b'] = bookmark_id
+    if snapshot:
+        value['s'] = 1
+    return _encode(value)
+
+
+def decode_sync_token(token):
+    """Returns (seq, bookmark_id or None, snapshot)."""
+    try:
+        value = _decode(token)
+        seq = int(value['v'])
+        bookmark_id = int(value['b']) if 'b' in value else None
+        snapshot = bool(value.get('s'))
+    except Exception:
+        raise InvalidCursor('Invalid sync token')
+    if seq < 0 or (snapshot and bookmark_id is None):
+        raise InvalidCursor('Invalid sync token')
+    return seq, bookmark_id, snapshot
+
+
+def page_size(requested):
+    default = current_app.config.get('BOOKMARKS_PAGE_SIZE', 50)
+    cap = current_app.config.get('BOOKMARKS_MAX_PAGE_SIZE', 200)
+    if not requested or requested < 1:
+        return default
+    return min(requested, cap)
+
+
+def keyset_page(query, limit, cursor=None, before=None):
+    """
+    Fetch one page of `query` (any query joined to UserBookmark), newest first,
+    ordered by (UserBookmark.created_at, UserBookmark.bookmark_id).
+
+    `cursor` continues after a page, `before` goes back to the page before it.
+    Returns (items, next_cursor, prev_cursor); cursors are None at either end.
+    """
+    created_at = UserBookmark.created_at
+    bookmark_id = UserBookmark.bookmark_id
+    query = query.add_columns(created_at, bookmark_id).order_by(None)
+
+    if before:
+        c_at, c_id = decode_cursor(before)
+        query = query.filter(db.or_(
+            created_at > c_at,
+            db.and_(created_at == c_at, bookmark_id > c_id)
+        )).order_by(created_at.asc(), bookmark_id.asc())
+    else:
+        if cursor:
+            c_at, c_id = decode_cursor(cursor)
+            query = query.filter(db.or_(
+                created_at < c_at,
+                db.and_(created_at == c_at, bookmark_id < c_id)
+            ))
+        query = query.order_by(created_at.desc(), bookmark_id.desc())
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before:
+        rows.reverse()
+
+    items = [row[0] for row in rows]
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or before:
+            next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+        if cursor or (before and has_more):
+            prev_cursor = encode_cursor(rows[0][-2], rows[0][-1])
+    return items, next_cursor, prev_cursor
+
+
+def ranked_page(query, score, limit, cursor=None, before=None):
+    """
+    Page through results ordered by a relevance `score` column (best first).
+    Relevance has no stable key to seek on, so these cursors carry an offset.
+    Returns (items, next_cursor, prev_cursor) like keyset_page.
+    """
+    if before:
+        offset = max(decode_offset_cursor(before) - limit, 0)
+    elif cursor:
+        offset = decode_offset_cursor(cursor)
+    else:
+        offset = 0
+
+    rows = (
+        query.order_by(None)
+        .order_by(score.desc(), UserBookmark.created_at.desc(), UserBookmark.bookmark_id.desc())
+        .offset(offset).limit(limit + 1).all()
+    )
+    has_more = len(rows) > limit
+    items = rows[:limit]
+
+    next_cursor = _encode({'o': offset + limit}) if has_more else None
+    prev_cursor = _encode({'o': offset}) if offset > 0 else None
+    return items, next_cursor, prev_cursor
@@ -0,0 +1,74 @@
+import io
+import threading
+from collections import OrderedDict
+import segno
+
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+class QRCache:
+    """
+    Rendered QR images keyed by (hash_url, scale, fmt). A bookmark's url never
+    changes, so entries never go stale; the cache is bounded by total bytes
+    and evicts least recently used images first.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_bytes = app.config.get('QR_CACHE_MAX_BYTES', self.max_bytes)
+        app.extensions['qr_cache'] = self
+
+    def render(self, url, hash_url, scale=5, fmt='png'):
+        """Return the image bytes for `url`, rendering it on a miss."""
+        key = (hash_url, scale, fmt)
+        with self._lock:
+            data = self._data.get(key)
+            if data is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        out = io.BytesIO()
+        segno.make(url).save(out, kind=fmt, scale=scale)
+        data = out.getvalue()
+        self._put(key, data)
+        return data
+
+    def _put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._data[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+qr_cache = QRCache()
@@ -0,0 +1,211 @@
+"""
+Full-text search over a user's bookmarks (title, notes, url).
+
+SQLite uses an FTS5 virtual table, MySQL a regular table with a FULLTEXT
+index. Other databases have no index and the caller falls back to ILIKE.
+The index is kept in sync by UserBookmark mapper events, inside the same
+transaction as the write.
+"""
+import re
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, text
+from app import db
+
+SEARCH_TABLE = 'bookmark_search'
+SUPPORTED_DIALECTS = ('sqlite', 'mysql')
+
+# title matches count most, then notes, then the url
+SQLITE_BM25 = f'bm25({SEARCH_TABLE}, 0.0, 10.0, 2.0, 1.0)'
+
+TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def _supported(connection):
+    return connection.dialect.name in SUPPORTED_DIALECTS
+
+
+def _rowid(user_id, bookmark_id):
+    # FTS5 rows are addressed by rowid; pack the composite key into one
+    return (user_id << 32) | bookmark_id
+
+
+# ----------------------------------------------------------------------
+# DDL
+# ----------------------------------------------------------------------
+def create_search_table(target, connection, **kw):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "owner, title, notes, url, bookmark_id UNINDEXED, "
+            "tokenize='unicode61', prefix='2 3')"
+        ))
+    elif dialect == 'mysql':
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "user_id INT NOT NULL, bookmark_id INT NOT NULL, "
+            "title VARCHAR(255), notes TEXT, url VARCHAR(255), "
+            "PRIMARY KEY (user_id, bookmark_id), "
+            "FULLTEXT KEY ft_bookmark_search (title, notes, url)"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        ))
+
+
+def drop_search_table(target, connection, **kw):
+    if _supported(connection):
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+
+# ----------------------------------------------------------------------
+# Writes
+# ----------------------------------------------------------------------
+def index_bookmarks(connection, rows):
+    """(Re)index rows of dicts with user_id, bookmark_id, title, notes, url."""
+    if not rows or not _supported(connection):
+        return
+    if connection.dialect.name == 'sqlite':
+        params = [dict(r, rowid=_rowid(r['user_id'], r['bookmark_id']), owner=f"u{r['user_id']}") for r in rows]
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"), params)
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, owner, title, notes, url, bookmark_id) "
+            "VALUES (:rowid, :owner, :title, :notes, :url, :bookmark_id)"
+        ), params)
+    else:
+        connection.execute(text(
+            f"REPLACE INTO {SEARCH_TABLE} (user_id, bookmark_id, title, notes, url) "
+            "VALUES (:user_id, :bookmark_id, :title, :notes, :url)"
+        ), rows)
+
+
+def unindex_bookmarks(connection, user_id, bookmark_ids):
+    if not bookmark_ids or not _supported(connection):
+        return
+    if connection.dialect.name == 'sqlite':
+        connection.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"),
+            [{'rowid': _rowid(user_id, b)} for b in bookmark_ids]
+        )
+    else:
+        connection.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE user_id = :user_id AND bookmark_id = :bookmark_id"),
+            [{'user_id': user_id, 'bookmark_id': b} for b in bookmark_ids]
+        )
+
+
+def _row_for(connection, ub):
+    from app.models.bookmark import Bookmark
+    url = connection.execute(
+        db.select(Bookmark.url).where(Bookmark.id == ub.bookmark_id)
+    ).scalar()
+    return {
+        'user_id': ub.user_id,
+        'bookmark_id': ub.bookmark_id,
+        'title': ub.title or '',
+        'notes': ub.notes or '',
+        'url': url or '',
+    }
+
+
+def _after_insert(mapper, connection, target):
+    if _supported(connection):
+        index_bookmarks(connection, [_row_for(connection, target)])
+
+
+def _after_update(mapper, connection, target):
+    if not _supported(connection):
+        return
+    state = inspect(target)
+    if state.attrs.title.history.has_changes() or state.attrs.notes.history.has_changes():
+        index_bookmarks(connection, [_row_for(connection, target)])
+
+
+def _after_delete(mapper, connection, target):
+    unindex_bookmarks(connection, target.user_id, [target.bookmark_id])
+
+
+# ----------------------------------------------------------------------
+# Reads
+# ----------------------------------------------------------------------
+def match_subquery(user_id, q):
+    """
+    Subquery of (bookmark_id, score) for the user's bookmarks matching every
+    term of `q` as a prefix, best match first when ordered by score.
+    Returns None when the database has no search index or q has no terms.
+    """
+    terms = TOKEN.findall(q.lower())
+    dialect = db.session.get_bind().dialect.name
+    if not terms or dialect not in SUPPORTED_DIALECTS:
+        return None
+
+    if dialect == 'sqlite':
+        phrases = ' '.join('"%s"*' % t.replace('"', '') for t in terms)
+        # the owner column only scopes rows; user terms must not match it
+        fts_query = f'owner : u{int(user_id)} AND {{title notes url}} : ({phrases})'
+        # bm25 is lower-is-better; negate it so a higher score is better everywhere
+        stmt = text(
+            f"SELECT bookmark_id, -{SQLITE_BM25} AS score FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH :fts_query"
+        ).bindparams(fts_query=fts_query)
+    else:
+        fts_query = ' '.join(f'+{t}*' for t in terms)
+        stmt = text(
+            "SELECT bookmark_id, MATCH (title, notes, url) AGAINST (:fts_query IN BOOLEAN MODE) AS score "
+            f"FROM {SEARCH_TABLE} WHERE user_id = :user_id "
+            "AND MATCH (title, notes, url) AGAINST (:fts_query IN BOOLEAN MODE)"
+        ).bindparams(fts_query=fts_query, user_id=user_id)
+
+    return stmt.columns(bookmark_id=db.Integer, score=db.Float).subquery('search_hits')
+
+
+def rebuild_search_index():
+    """Rebuild the whole index from user_bookmark; returns the row count."""
+    from app.models.bookmark import Bookmark
+    from app.models.user_bookmark import UserBookmark
+
+    connection = db.session.connection()
+    if not _supported(connection):
+        return 0
+    create_search_table(None, connection)
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+
+    query = (
+        db.select(UserBookmark.user_id, UserBookmark.bookmark_id, UserBookmark.title,
+                  UserBookmark.notes, Bookmark.url)
+        .join(Bookmark, Bookmark.id == UserBookmark.bookmark_id)
+        .execution_options(yield_per=1000)
+    )
+    total = 0
+    batch = []
+    for row in db.session.execute(query):
+        batch.append({
+            'user_id': row.user_id, 'bookmark_id': row.bookmark_id,
+            'title': row.title or '', 'notes': row.notes or '', 'url': row.url or ''
+        })
+        if len(batch) >= 1000:
+            index_bookmarks(connection, batch)
+            total += len(batch)
+            batch = []
+    index_bookmarks(connection, batch)
+    total += len(batch)
+    db.session.commit()
+    return total
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Rebuild the bookmark full-text search index."""
+    click.echo(f"Indexed {rebuild_search_index()} bookmarks")
+
+
+def init_app(app):
+    from app.models.user_bookmark import UserBookmark
+
+    if not event.contains(db.metadata, 'after_create', create_search_table):
+        event.listen(db.metadata, 'after_create', create_search_table)
+        event.listen(db.metadata, 'before_drop', drop_search_table)
+        event.listen(UserBookmark, 'after_insert', _after_insert)
+        event.listen(UserBookmark, 'after_update', _after_update)
+        event.listen(UserBookmark, 'after_delete', _after_delete)
+    app.cli.add_command(rebuild_search_index_command)
@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+
+
+class ShortCodeCache:
+    """In-process LRU of short_code -> (bookmark_id, url) for the redirect endpoint."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('SHORT_CODE_CACHE_SIZE', self.maxsize)
+        self._register_listeners()
+        app.extensions['short_code_cache'] = self
+
+    def get(self, short_code):
+        with self._lock:
+            entry = self._data.get(short_code)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(short_code)
+            self.hits += 1
+            return entry
+
+    def put(self, short_code, bookmark_id, url):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[short_code] = (bookmark_id, url)
+            self._data.move_to_end(short_code)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, short_code):
+        with self._lock:
+            self._data.pop(short_code, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _register_listeners(self):
+        from sqlalchemy import event
+        from app.models.bookmark import Bookmark
+
+        if event.contains(Bookmark, 'after_delete', self._on_delete):
+            return
+        event.listen(Bookmark, 'after_delete', self._on_delete)
+        event.listen(Bookmark, 'after_update', self._on_update)
+
+    def _on_delete(self, mapper, connection, target):
+        self.invalidate(target.short_url)
+
+    def _on_update(self, mapper, connection, target):
+        from sqlalchemy import inspect
+        # drop the old code as well if the short code itself was changed
+        for old_code in inspect(target).attrs.short_url.history.deleted or ():
+            self.invalidate(old_code)
+        self.invalidate(target.short_url)
+
+
+short_code_cache = ShortCodeCache()
@@ -0,0 +1,132 @@
+"""
+Collision-free short codes.
+
+Codes are a bijective scramble of a sequence number, written in base62 at a
+fixed length, so two sequence numbers can never produce the same code and
+nothing has to be checked against the bookmark table. Sequence numbers are
+reserved in blocks from short_code_sequence, in a transaction of their own,
+and handed out from memory; each process (and each forked worker) holds its
+own block.
+
+Legacy codes are 6 random characters, so the default length of 7 keeps the
+two sets disjoint.
+"""
+import os
+import string
+import threading
+from app import db
+from app.models.short_code_sequence import ShortCodeSequence
+from app.utils.bulk import insert_ignore
+
+ALPHABET = string.ascii_letters + string.digits
+BASE = len(ALPHABET)
+SEQUENCE_NAME = 'bookmark'
+
+GOLDEN_RATIO = 0.6180339887498949
+OFFSET = 0x2545F4914F6CDD1D
+
+
+def scramble_multiplier(space):
+    """
+    An odd number that is not a multiple of 31, hence coprime with 62**n, so
+    value -> (value * m + OFFSET) % space is a bijection. Picking it near
+    space / phi spreads consecutive values across the whole code space.
+    """
+    m = int(space * GOLDEN_RATIO) | 1
+    while m % 31 == 0:
+        m += 2
+    return m
+
+
+class ShortCodeSpaceExhausted(RuntimeError):
+    pass
+
+
+class ShortCodeAllocator:
+    """Hands out short codes from a block of sequence numbers reserved in the database."""
+
+    def __init__(self, length=7, block_size=1000, scramble=True):
+        self.length = length
+        self.block_size = block_size
+        self.scramble = scramble
+        self.reservations = 0
+        self._next = self._end = 0
+        self._pid = None
+        self._multiplier = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.length = app.config.get('SHORT_CODE_LENGTH', self.length)
+        self.block_size = app.config.get('SHORT_CODE_BLOCK_SIZE', self.block_size)
+        self.scramble = app.config.get('SHORT_CODE_SCRAMBLE', self.scramble)
+        app.extensions['short_codes'] = self
+
+    @property
+    def space(self):
+        return BASE ** self.length
+
+    def encode(self, value):
+        space = self.space
+        if value >= space:
+            raise ShortCodeSpaceExhausted(f'all {space} codes of length {self.length} are used')
+        if self.scramble:
+            if self._multiplier is None or self._multiplier[0] != space:
+                self._multiplier = (space, scramble_multiplier(space))
+            value = (value * self._multiplier[1] + OFFSET) % space
+        chars = []
+        for _ in range(self.length):
+            value, digit = divmod(value, BASE)
+            chars.append(ALPHABET[digit])
+        return ''.join(reversed(chars))
+
+    def next_code(self):
+        return self.allocate(1)[0]
+
+    def allocate(self, n):
+        """
+        Return `n` unique codes. On SQLite call this before writing in the
+        request's session, since reserving a block needs the write lock.
+        """
+        codes = []
+        with self._lock:
+            if self._pid != os.getpid():
+                # a block inherited through fork() is also held by the parent
+                self._next = self._end = 0
+                self._pid = os.getpid()
+            while len(codes) < n:
+                if self._next >= self._end:
+                    self._reserve(max(self.block_size, n - len(codes)))
+                take = min(n - len(codes), self._end - self._next)
+                codes.extend(self.encode(v) for v in range(self._next, self._next + take))
+                self._next += take
+        return codes
+
+    def _reserve(self, size):
+        table = ShortCodeSequence.__table__
+        bump = (
+            table.update()
+            .where(table.c.name == SEQUENCE_NAME)
+            .values(next_value=table.c.next_value + size)
+        )
+        # committed on its own so a rolled back request never gives a block back
+        with db.engine.begin() as conn:
+            if conn.execute(bump).rowcount == 0:
+                conn.execute(insert_ignore(table, bind=conn), {'name': SEQUENCE_NAME, 'next_value': 0})
+                conn.execute(bump)
+            end = conn.execute(
+                db.select(table.c.next_value).where(table.c.name == SEQUENCE_NAME)
+            ).scalar_one()
+        self._next, self._end = end - size, end
+        self.reservations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'length': self.length,
+                'block_size': self.block_size,
+                'remaining_in_block': self._end - self._next,
+                'reservations': self.reservations,
+            }
+
+
+short_codes = ShortCodeAllocator()
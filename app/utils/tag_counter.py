@@ -1,37 +1,152 @@
+"""
+Per-(user, tag) bookmark counts kept in user_tag_count.
+
+Writes to tag_user_bookmark go through link_tags / unlink_tags, which
+record +1/-1 deltas on the session. Right before the transaction commits
+all deltas are applied with one batched upsert, so a request (or a whole
+import chunk) costs one extra statement no matter how many tags it touched.
+"""
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, bindparam, select, func, delete
 from app import db
-from app.models.bookmark import Bookmark
 from app.models.tag_user_bookmark import tag_user_bookmarks
-from app.models.user_bookmark import UserBookmark
-from sqlalchemy import select, func, update, delete
-
-
-def recalc_user_tag_count(user_id, tag_id):
-    # Count bookmarks for this (user, tag)
-    count = db.session.scalar(
-        select(func.count())
-        .select_from(tag_user_bookmarks)
-        .where(
-            tag_user_bookmarks.c.user_id == user_id,
-            tag_user_bookmarks.c.tag_id == tag_id
-        )
-    )
+from app.models.user_tag_count import UserTagCount
+from app.utils.change_log import record_changes
+
+DELTAS_KEY = 'tag_count_deltas'
+# users whose counters changed in this commit, for app.utils.user_stats
+TAG_USERS_KEY = 'tag_count_users'
+
+
+def add_tag_delta(user_id, tag_id, delta, session=None):
+    session = session or db.session
+    deltas = session.info.setdefault(DELTAS_KEY, {})
+    deltas[(user_id, tag_id)] = deltas.get((user_id, tag_id), 0) + delta
+
+
+def link_tags(rows, session=None):
+    """Insert tag_user_bookmark rows (dicts of tag_id, user_id, bookmark_id) in one executemany."""
+    if not rows:
+        return
+    session = session or db.session
+    session.execute(tag_user_bookmarks.insert(), rows)
+    for row in rows:
+        add_tag_delta(row['user_id'], row['tag_id'], 1, session)
+        record_changes(row['user_id'], [row['bookmark_id']], session=session)
+
+
+def unlink_tags(user_id, bookmark_ids, tag_ids=None, session=None):
+    """
+    Remove the user's tags from the given bookmarks (all of them when
+    tag_ids is None). Returns the (bookmark_id, tag_id) pairs removed.
+    """
+    if not bookmark_ids:
+        return []
+    session = session or db.session
+    where = [
+        tag_user_bookmarks.c.user_id == user_id,
+        tag_user_bookmarks.c.bookmark_id.in_(bookmark_ids)
+    ]
+    if tag_ids is not None:
+        if not tag_ids:
+            return []
+        where.append(tag_user_bookmarks.c.tag_id.in_(tag_ids))
+
+    removed = session.execute(
+        select(tag_user_bookmarks.c.bookmark_id, tag_user_bookmarks.c.tag_id).where(*where)
+    ).all()
+    if removed:
+        session.execute(tag_user_bookmarks.delete().where(*where))
+        for bookmark_id, tag_id in removed:
+            add_tag_delta(user_id, tag_id, -1, session)
+        record_changes(user_id, {bookmark_id for bookmark_id, _ in removed}, session=session)
+    return [tuple(r) for r in removed]
+
+
+def _upsert_counts(session, rows):
+    table = UserTagCount.__table__
+    dialect = session.get_bind().dialect.name
 
-    if count == 0:
-        # Remove rows for this (user, tag)
-        db.session.execute(
-            delete(tag_user_bookmarks).where(
-                tag_user_bookmarks.c.user_id == user_id,
-                tag_user_bookmarks.c.tag_id == tag_id
-            )
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update(
+            bookmark_count=table.c.bookmark_count + stmt.inserted.bookmark_count
         )
+    else:
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.tag_id],
+            set_={'bookmark_count': table.c.bookmark_count + stmt.excluded.bookmark_count}
+        )
+    session.execute(stmt, rows)
+
+
+def apply_tag_deltas(session):
+    deltas = session.info.pop(DELTAS_KEY, None)
+    if not deltas:
+        return
+    rows = [
+        {'user_id': user_id, 'tag_id': tag_id, 'bookmark_count': delta}
+        for (user_id, tag_id), delta in deltas.items() if delta
+    ]
+    if not rows:
         return
+    _upsert_counts(session, rows)
+    session.info.setdefault(TAG_USERS_KEY, set()).update(r['user_id'] for r in rows)
+
+    # drop counters that reached zero
+    shrunk = [(r['user_id'], r['tag_id']) for r in rows if r['bookmark_count'] < 0]
+    if shrunk:
+        table = UserTagCount.__table__
+        session.execute(
+            delete(table).where(
+                table.c.user_id == bindparam('u_id'),
+                table.c.tag_id == bindparam('t_id'),
+                table.c.bookmark_count <= 0
+            ),
+            [{'u_id': u, 't_id': t} for u, t in shrunk]
+        )
+
 
-    # Update all rows for this (user, tag)
+def _discard_deltas(session, *args):
+    session.info.pop(DELTAS_KEY, None)
+    session.info.pop(TAG_USERS_KEY, None)
+
+
+def rebuild_tag_counts():
+    """Recompute user_tag_count from tag_user_bookmark; returns the row count."""
+    table = UserTagCount.__table__
+    db.session.execute(delete(table))
     db.session.execute(
-        update(tag_user_bookmarks)
-        .where(
-            tag_user_bookmarks.c.user_id == user_id,
-            tag_user_bookmarks.c.tag_id == tag_id
+        table.insert().from_select(
+            ['user_id', 'tag_id', 'bookmark_count'],
+            select(
+                tag_user_bookmarks.c.user_id,
+                tag_user_bookmarks.c.tag_id,
+                func.count()
+            ).group_by(tag_user_bookmarks.c.user_id, tag_user_bookmarks.c.tag_id)
         )
-        .values(bookmark_count=count)
-    )
\ No newline at end of file
+    )
+    total = db.session.scalar(select(func.count()).select_from(table))
+    db.session.commit()
+    return total
+
+
+@click.command('rebuild-tag-counts')
+@with_appcontext
+def rebuild_tag_counts_command():
+    """Recompute per-user tag counts from tag_user_bookmark."""
+    click.echo(f"Rebuilt {rebuild_tag_counts()} tag counters")
+
+
+def init_app(app):
+    if not event.contains(db.session, 'before_commit', apply_tag_deltas):
+        event.listen(db.session, 'before_commit', apply_tag_deltas)
+        event.listen(db.session, 'after_rollback', _discard_deltas)
+    app.cli.add_command(rebuild_tag_counts_command)
@@ -0,0 +1,186 @@
+"""
+Tag name -> id resolution shared by create, update, import and enrichment.
+
+All names are resolved with one IN query; missing tags are added with a
+single conflict-tolerant bulk insert and read back. Ids of the hottest tags
+are kept in an in-process LRU so the common case costs no query at all.
+"""
+import threading
+from collections import OrderedDict
+from sqlalchemy import event
+from app import db
+from app.utils.bulk import insert_ignore, chunked
+from app.utils.tag_counter import link_tags, unlink_tags
+
+PENDING_KEY = 'tag_ids_pending'
+MAX_TAG_LENGTH = 50
+
+
+def clean_tag_names(names):
+    """Lower-case, trim and de-duplicate tag names, keeping their order."""
+    cleaned = []
+    for name in names or []:
+        name = str(name).strip().lower()[:MAX_TAG_LENGTH]
+        if name and name not in cleaned:
+            cleaned.append(name)
+    return cleaned
+
+
+class TagResolver:
+    """Bulk tag lookup/creation with an LRU of name -> id."""
+
+    def __init__(self, maxsize=5000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('TAG_CACHE_SIZE', self.maxsize)
+        self._register_listeners()
+        app.extensions['tag_resolver'] = self
+
+    def resolve(self, names, session=None, create=True):
+        """
+        Return {name: id} for the given (already cleaned) names, creating
+        tags that don't exist yet unless `create` is False.
+        """
+        session = session or db.session
+        from app.models.tag import Tag
+
+        ids = {}
+        wanted = []
+        with self._lock:
+            for name in dict.fromkeys(names):
+                tag_id = self._data.get(name)
+                if tag_id is None:
+                    wanted.append(name)
+                else:
+                    self._data.move_to_end(name)
+                    ids[name] = tag_id
+            self.hits += len(ids)
+            self.misses += len(wanted)
+        if not wanted:
+            return ids
+
+        found = self._select(session, Tag, wanted)
+        missing = [n for n in wanted if n not in found]
+        created = {}
+        if missing and create:
+            session.execute(insert_ignore(Tag.__table__, session), [{'name': n} for n in missing])
+            created = self._select(session, Tag, missing)
+
+        # tags created by this transaction are only cached once it commits
+        pending = session.info.setdefault(PENDING_KEY, {})
+        pending.update(created)
+        self._store({n: i for n, i in found.items() if n not in pending})
+
+        ids.update(found)
+        ids.update(created)
+        return ids
+
+    def _select(self, session, Tag, names):
+        ids = {}
+        for chunk in chunked(names, 500):
+            ids.update(session.execute(db.select(Tag.name, Tag.id).where(Tag.name.in_(chunk))).all())
+        return ids
+
+    def _store(self, ids):
+        if self.maxsize <= 0 or not ids:
+            return
+        with self._lock:
+            for name, tag_id in ids.items():
+                self._data[name] = tag_id
+                self._data.move_to_end(name)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, name):
+        with self._lock:
+            self._data.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _register_listeners(self):
+        from app.models.tag import Tag
+
+        if event.contains(db.session, 'after_commit', self._on_commit):
+            return
+        event.listen(db.session, 'after_commit', self._on_commit)
+        event.listen(db.session, 'after_rollback', self._on_rollback)
+        event.listen(Tag, 'after_delete', self._on_delete)
+
+    def _on_commit(self, session):
+        self._store(session.info.pop(PENDING_KEY, None))
+
+    def _on_rollback(self, session):
+        session.info.pop(PENDING_KEY, None)
+
+    def _on_delete(self, mapper, connection, target):
+        self.invalidate(target.name)
+
+
+tag_resolver = TagResolver()
+
+
+def resolve_tag_ids(names, session=None, create=True):
+    return tag_resolver.resolve(names, session, create)
+
+
+def tag_bookmarks(user_id, bookmark_ids, names, session=None):
+    """
+    Attach the cleaned tag `names` to every bookmark in `bookmark_ids` for
+    the user: one resolve plus one executemany for the association rows.
+    Returns the {name: id} mapping used.
+    """
+    names = clean_tag_names(names)
+    if not names or not bookmark_ids:
+        return {}
+    ids = resolve_tag_ids(names, session)
+    link_tags([
+        {'tag_id': ids[n], 'user_id': user_id, 'bookmark_id': b}
+        for b in bookmark_ids for n in names if n in ids
+    ], session)
+    return ids
+
+
+def set_bookmark_tags(user_id, bookmark_id, names, session=None):
+    """
+    Make the user's tags on a bookmark exactly `names`, touching only the
+    association rows (and tag counts) that actually change.
+    Returns (added_tag_ids, removed_tag_ids).
+    """
+    from app.models.tag_user_bookmark import tag_user_bookmarks
+
+    session = session or db.session
+    names = clean_tag_names(names)
+    current = set(session.execute(
+        db.select(tag_user_bookmarks.c.tag_id).where(
+            tag_user_bookmarks.c.user_id == user_id,
+            tag_user_bookmarks.c.bookmark_id == bookmark_id
+        )
+    ).scalars())
+    wanted = set(resolve_tag_ids(names, session).values()) if names else set()
+
+    added = wanted - current
+    removed = current - wanted
+    if removed:
+        unlink_tags(user_id, [bookmark_id], list(removed), session)
+    if added:
+        link_tags([
+            {'tag_id': tag_id, 'user_id': user_id, 'bookmark_id': bookmark_id}
+            for tag_id in added
+        ], session)
+    return added, removed
@@ -0,0 +1,117 @@
+"""
+Short-lived identity cache behind Flask-Login's user_loader.
+
+Every authenticated request used to load the whole User row only to read
+current_user.id (and, on two pages, current_user.username). load() keeps a
+CachedUser with just those two fields per user id for USER_CACHE_TTL
+seconds, so a logged-in client costs no query for its identity. Updates and
+deletes of a User through the ORM evict its entry in this process; other
+worker processes pick up the change when their copy expires.
+
+Code that needs the rest of the row loads it explicitly:
+db.session.get(User, current_user.id).
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask_login import UserMixin
+from sqlalchemy import event
+from app import db
+
+
+class CachedUser(UserMixin):
+    """The part of a User that request handlers read from current_user."""
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+class UserCache:
+    """LRU of user id -> (expires_at, CachedUser)."""
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('USER_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        self._register_listeners()
+        app.extensions['user_cache'] = self
+
+    def load(self, user_id):
+        """The CachedUser for a session's user id, or None if there is no such user."""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        from app.models.user import User
+        row = db.session.execute(
+            db.select(User.id, User.username).where(User.id == user_id)
+        ).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+        user = CachedUser(row.id, row.username)
+        self._store(user, now)
+        return user
+
+    def _store(self, user, now):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[user.id] = (now + self.ttl, user)
+            self._data.move_to_end(user.id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _register_listeners(self):
+        from app.models.user import User
+
+        if event.contains(User, 'after_update', self._on_change):
+            return
+        # profile edits and set_password() both go through an UPDATE of the row
+        event.listen(User, 'after_update', self._on_change)
+        event.listen(User, 'after_delete', self._on_change)
+
+    def _on_change(self, mapper, connection, target):
+        self.invalidate(target.id)
+
+
+user_cache = UserCache()
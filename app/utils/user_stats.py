@@ -0,0 +1,254 @@
+"""
+Per-user stats (bookmark, archived and tag counts, top tags) kept in user_stats.
+
+ORM writes to UserBookmark are picked up by mapper events; bulk paths call
+add_stats_delta themselves. Right before a transaction commits the deltas are
+applied with relative UPDATEs, and users whose tag counters moved get their
+tag count and top tags re-read from user_tag_count. A user without a row
+yet is computed from scratch once.
+
+Every user touched by a transaction also gets `version` bumped, which is
+what the HTTP ETags in app.utils.http_cache are built from, and the
+bookmarks it changed are stamped with that version in the change log.
+"""
+import json
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, bindparam, func, case, delete
+from sqlalchemy.orm import object_session
+from app import db
+from app.models.tag import Tag
+from app.models.user_bookmark import UserBookmark
+from app.models.user_stats import UserStats
+from app.models.user_tag_count import UserTagCount
+from app.utils.bulk import insert_ignore, chunked
+from app.utils.tag_counter import TAG_USERS_KEY
+from app.utils.change_log import record_changes, pop_changes, write_changes
+
+DELTAS_KEY = 'user_stats_deltas'
+STALE_KEY = 'user_stats_stale'
+TOUCHED_KEY = 'user_stats_touched'
+TOP_TAGS = 10
+
+
+def add_stats_delta(user_id, total=0, archived=0, session=None):
+    session = session or db.session
+    deltas = session.info.setdefault(DELTAS_KEY, {})
+    current = deltas.get(user_id, (0, 0))
+    deltas[user_id] = (current[0] + total, current[1] + archived)
+
+
+def touch(user_id, session=None):
+    """Bump the user's version at commit without changing any counts."""
+    session = session or db.session
+    session.info.setdefault(TOUCHED_KEY, set()).add(user_id)
+
+
+def mark_stale(user_id, session=None):
+    """Have the user's stats recomputed from scratch when the transaction commits."""
+    session = session or db.session
+    session.info.setdefault(STALE_KEY, set()).add(user_id)
+
+
+# ----------------------------------------------------------------------
+# Mapper events (ORM writes)
+# ----------------------------------------------------------------------
+def _after_insert(mapper, connection, target):
+    session = object_session(target)
+    add_stats_delta(target.user_id, 1, 1 if target.archived else 0, session)
+    record_changes(target.user_id, [target.bookmark_id], session=session)
+
+
+def _after_delete(mapper, connection, target):
+    session = object_session(target)
+    add_stats_delta(target.user_id, -1, -1 if target.archived else 0, session)
+    record_changes(target.user_id, [target.bookmark_id], deleted=True, session=session)
+
+
+def _after_update(mapper, connection, target):
+    session = object_session(target)
+    touch(target.user_id, session)
+    record_changes(target.user_id, [target.bookmark_id], session=session)
+    history = inspect(target).attrs.archived.history
+    if not history.has_changes():
+        return
+    if not history.deleted:
+        # previous value was never loaded; can't tell if it flipped
+        mark_stale(target.user_id, session)
+        return
+    was, now = bool(history.deleted[0]), bool(target.archived)
+    if was != now:
+        add_stats_delta(target.user_id, 0, 1 if now else -1, session)
+
+
+# ----------------------------------------------------------------------
+# Computing
+# ----------------------------------------------------------------------
+def _top_n():
+    return current_app.config.get('USER_STATS_TOP_TAGS', TOP_TAGS)
+
+
+def _tag_stats(session, user_id):
+    where = (UserTagCount.user_id == user_id, UserTagCount.bookmark_count > 0)
+    tag_count = session.scalar(db.select(func.count()).select_from(UserTagCount).where(*where))
+    top = session.execute(
+        db.select(Tag.name, UserTagCount.bookmark_count)
+        .join(Tag, Tag.id == UserTagCount.tag_id)
+        .where(*where)
+        .order_by(UserTagCount.bookmark_count.desc(), Tag.name)
+        .limit(_top_n())
+    ).all()
+    return {
+        'tag_count': tag_count or 0,
+        'top_tags': json.dumps([{'name': name, 'count': count} for name, count in top]),
+    }
+
+
+def compute_user_stats(session, user_ids):
+    """Full stats rows for the given users, from user_bookmark and user_tag_count."""
+    rows = {u: {'user_id': u, 'bookmark_count': 0, 'archived_count': 0} for u in user_ids}
+    for chunk in chunked(list(user_ids), 500):
+        for user_id, total, archived in session.execute(
+            db.select(
+                UserBookmark.user_id,
+                func.count(),
+                func.coalesce(func.sum(case((UserBookmark.archived, 1), else_=0)), 0)
+            )
+            .where(UserBookmark.user_id.in_(chunk))
+            .group_by(UserBookmark.user_id)
+        ):
+            rows[user_id].update(bookmark_count=total, archived_count=int(archived))
+    for user_id, row in rows.items():
+        row.update(_tag_stats(session, user_id))
+    return list(rows.values())
+
+
+def _write_full(session, rows, existing):
+    table = UserStats.__table__
+    inserts = [r for r in rows if r['user_id'] not in existing]
+    updates = [r for r in rows if r['user_id'] in existing]
+    if inserts:
+        session.execute(insert_ignore(table, session), inserts)
+    if updates:
+        session.execute(
+            table.update().where(table.c.user_id == bindparam('u_id')).values(
+                bookmark_count=bindparam('bookmark_count'),
+                archived_count=bindparam('archived_count'),
+                tag_count=bindparam('tag_count'),
+                top_tags=bindparam('top_tags'),
+                version=table.c.version + 1,
+                updated_at=datetime.utcnow()
+            ),
+            [dict(r, u_id=r['user_id']) for r in updates]
+        )
+
+
+def apply_stats(session):
+    # pending objects are only flushed after before_commit; flush now so
+    # their mapper events have recorded deltas before we read them
+    session.flush()
+    deltas = session.info.pop(DELTAS_KEY, None) or {}
+    tag_users = session.info.pop(TAG_USERS_KEY, None) or set()
+    stale = session.info.pop(STALE_KEY, None) or set()
+    touched = session.info.pop(TOUCHED_KEY, None) or set()
+    changes = pop_changes(session)
+    users = set(deltas) | tag_users | stale | touched | {u for u, _ in changes}
+    if not users:
+        return
+
+    table = UserStats.__table__
+    existing = set()
+    for chunk in chunked(list(users), 500):
+        existing.update(session.execute(
+            db.select(table.c.user_id).where(table.c.user_id.in_(chunk))
+        ).scalars())
+
+    # users without a row (or with a suspect one) are computed in full,
+    # which already includes this transaction's writes
+    full = (users - existing) | stale
+    if full:
+        _write_full(session, compute_user_stats(session, full), existing)
+
+    counts = [
+        {'u_id': u, 'd_total': deltas.get(u, (0, 0))[0], 'd_archived': deltas.get(u, (0, 0))[1]}
+        for u in users - full
+    ]
+    if counts:
+        session.execute(
+            table.update().where(table.c.user_id == bindparam('u_id')).values(
+                bookmark_count=table.c.bookmark_count + bindparam('d_total'),
+                archived_count=table.c.archived_count + bindparam('d_archived'),
+                version=table.c.version + 1,
+                updated_at=datetime.utcnow()
+            ),
+            counts
+        )
+
+    tags = [dict(_tag_stats(session, u), u_id=u) for u in tag_users if u not in full]
+    if tags:
+        session.execute(
+            table.update().where(table.c.user_id == bindparam('u_id')).values(
+                tag_count=bindparam('tag_count'),
+                top_tags=bindparam('top_tags')
+            ),
+            tags
+        )
+
+    if changes:
+        change_users = list({u for u, _ in changes})
+        versions = {}
+        for chunk in chunked(change_users, 500):
+            versions.update(session.execute(
+                db.select(table.c.user_id, table.c.version).where(table.c.user_id.in_(chunk))
+            ).all())
+        write_changes(session, changes, versions)
+
+
+def _discard(session, *args):
+    session.info.pop(DELTAS_KEY, None)
+    session.info.pop(STALE_KEY, None)
+    session.info.pop(TOUCHED_KEY, None)
+
+
+# ----------------------------------------------------------------------
+# Reads
+# ----------------------------------------------------------------------
+def get_user_stats(user_id):
+    """The user's stats row, built on first use for accounts that predate it."""
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        db.session.execute(insert_ignore(UserStats.__table__), compute_user_stats(db.session, [user_id]))
+        db.session.commit()
+        stats = db.session.get(UserStats, user_id)
+    return stats
+
+
+def rebuild_user_stats():
+    """Recompute user_stats for every user with bookmarks; returns the row count."""
+    db.session.execute(delete(UserStats.__table__))
+    user_ids = db.session.execute(db.select(UserBookmark.user_id).distinct()).scalars().all()
+    rows = compute_user_stats(db.session, user_ids)
+    for chunk in chunked(rows, 500):
+        db.session.execute(UserStats.__table__.insert(), chunk)
+    db.session.commit()
+    return len(rows)
+
+
+@click.command('rebuild-user-stats')
+@with_appcontext
+def rebuild_user_stats_command():
+    """Recompute per-user dashboard stats from the bookmark tables."""
+    click.echo(f"Rebuilt stats for {rebuild_user_stats()} users")
+
+
+def init_app(app):
+    # must run after tag_counter's before_commit hook, which settles user_tag_count
+    if not event.contains(db.session, 'before_commit', apply_stats):
+        event.listen(db.session, 'before_commit', apply_stats)
+        event.listen(db.session, 'after_rollback', _discard)
+        event.listen(UserBookmark, 'after_insert', _after_insert)
+        event.listen(UserBookmark, 'after_delete', _after_delete)
+        event.listen(UserBookmark, 'after_update', _after_update)
+    app.cli.add_command(rebuild_user_stats_command)
@@ -0,0 +1,126 @@
+"""
+Metadata extraction benchmark: old double fetch vs single head-only fetch.
+Run:  python benchmarks/bench_metadata.py [--rounds 20] [--body-kb 400] [--delay-ms 50]
+
+Spins up a local stand-in HTTP server that serves a page with a small <head>
+and a large <body>, then times both strategies against it.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.page_metadata import fetch_page_metadata, FETCH_HEADERS
+
+
+def make_page(body_kb):
+    head = (
+        '<!DOCTYPE html><html><head>'
+        '<meta charset="utf-8">'
+        '<title>Benchmark Page</title>'
+        '<meta name="keywords" content="python, flask, bookmarks">'
+        '<meta name="description" content="Stand-in page for metadata benchmarks">'
+        '</head>'
+    )
+    para = '<p>' + 'lorem ipsum dolor sit amet ' * 36 + '</p>\n'
+    body = para * max(1, (body_kb * 1024) // len(para))
+    return (head + '<body>' + body + '</body></html>').encode()
+
+
+def make_handler(page, delay):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(page)))
+            self.end_headers()
+            # write in slices so an early client close is cheap
+            try:
+                for i in range(0, len(page), 16384):
+                    self.wfile.write(page[i:i + 16384])
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def legacy_extract(url):
+    """The pre-refactor create_bookmark path: two full fetches + two full parses."""
+    bytes_read = 0
+
+    resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=6)
+    bytes_read += len(resp.content)
+    soup = BeautifulSoup(resp.text, "html.parser")
+    meta_tag = soup.find("meta", attrs={"name": "keywords"})
+    keywords = [kw.strip().lower() for kw in meta_tag.get("content").split(",")] if meta_tag else []
+
+    resp = requests.get(url, headers=FETCH_HEADERS, timeout=8)
+    bytes_read += len(resp.content)
+    soup = BeautifulSoup(resp.text, 'html.parser')
+    title_tag = soup.find('title')
+    title = title_tag.get_text(strip=True) if title_tag else None
+
+    return {'title': title, 'keywords': keywords, 'bytes_read': bytes_read}
+
+
+def run(fn, url, rounds):
+    timings = []
+    bytes_read = 0
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn(url)
+        timings.append(time.perf_counter() - start)
+        bytes_read += result['bytes_read']
+    timings.sort()
+    return {
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'max_ms': timings[-1] * 1000,
+        'bytes_per_call': bytes_read // rounds,
+        'title': result['title'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--body-kb', type=int, default=400)
+    parser.add_argument('--delay-ms', type=int, default=50, help='simulated origin latency per request')
+    args = parser.parse_args()
+
+    page = make_page(args.body_kb)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(page, args.delay_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/'
+
+    print(f"Page size: {len(page) / 1024:.0f} KB, origin delay: {args.delay_ms} ms, rounds: {args.rounds}\n")
+    results = {
+        'legacy (2 fetches)': run(legacy_extract, url, args.rounds),
+        'single head fetch': run(fetch_page_metadata, url, args.rounds),
+    }
+    server.shutdown()
+
+    print(f"{'strategy':<20} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9} {'bytes/call':>12}")
+    for name, r in results.items():
+        print(f"{name:<20} {r['mean_ms']:>9.1f} {r['p50_ms']:>9.1f} {r['max_ms']:>9.1f} {r['bytes_per_call']:>12,}")
+
+    old, new = results['legacy (2 fetches)'], results['single head fetch']
+    print(f"\nlatency: {old['mean_ms'] / new['mean_ms']:.1f}x faster, "
+          f"bytes read: {old['bytes_per_call'] / max(new['bytes_per_call'], 1):.0f}x fewer")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Query count / latency of per-row vs bulk bookmark serialization.
+Run:  python benchmarks/bench_serialize.py [--bookmarks 2000] [--tags-per 3]
+
+Exits non-zero if serialize_bookmarks() issues more than the expected
+constant number of queries, so it doubles as an N+1 regression check.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.bookmark import Bookmark, serialize_bookmarks, SERIALIZE_CHUNK
+from app.models.tag import Tag
+from app.models.user import User
+from app.models.user_bookmark import UserBookmark
+from app.models.tag_user_bookmark import tag_user_bookmarks
+
+
+def seed(n_bookmarks, tags_per):
+    db.session.execute(db.insert(User), [
+        {'id': 1, 'username': 'bench', 'name': 'Bench', 'email': 'bench@example.com', 'password_hash': 'x'}
+    ])
+    db.session.execute(db.insert(Tag), [{'id': i, 'name': f'tag{i}'} for i in range(1, 51)])
+    db.session.execute(db.insert(Bookmark), [
+        {'id': i, 'url': f'https://example.com/{i}', 'hash_url': f'h{i}', 'short_url': f's{i}'}
+        for i in range(1, n_bookmarks + 1)
+    ])
+    db.session.execute(db.insert(UserBookmark), [
+        {'user_id': 1, 'bookmark_id': i, 'title': f'Bookmark {i}'}
+        for i in range(1, n_bookmarks + 1)
+    ])
+    db.session.execute(tag_user_bookmarks.insert(), [
+        {'tag_id': (i + k) % 50 + 1, 'user_id': 1, 'bookmark_id': i}
+        for i in range(1, n_bookmarks + 1) for k in range(tags_per)
+    ])
+    db.session.commit()
+
+
+def legacy_serialize(bookmarks, user_id):
+    """Per-row pattern this replaced: a tags query and a UserBookmark query per bookmark."""
+    out = []
+    for b in bookmarks:
+        data = {'id': b.id, 'url': b.url, 'tags': [t.name for t in b.tags]}
+        ub = b.user_bookmarks.filter_by(user_id=user_id).first()
+        if ub:
+            data['title'] = ub.title
+        out.append(data)
+    return out
+
+
+def measure(fn, bookmarks):
+    counter = {'n': 0}
+
+    def count(*args):
+        counter['n'] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    start = time.perf_counter()
+    fn(bookmarks, 1)
+    elapsed = time.perf_counter() - start
+    event.remove(db.engine, 'before_cursor_execute', count)
+    return counter['n'], elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bookmarks', type=int, default=2000)
+    parser.add_argument('--tags-per', type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        seed(args.bookmarks, args.tags_per)
+        bookmarks = Bookmark.query.order_by(Bookmark.id).all()
+
+        results = {
+            'per-row to_dict': measure(legacy_serialize, bookmarks),
+            'serialize_bookmarks': measure(serialize_bookmarks, bookmarks),
+        }
+
+    print(f"{args.bookmarks} bookmarks, {args.tags_per} tags each\n")
+    print(f"{'strategy':<22} {'queries':>8} {'ms':>9}")
+    for name, (queries, ms) in results.items():
+        print(f"{name:<22} {queries:>8} {ms:>9.1f}")
+
+    expected = 2 * -(-args.bookmarks // SERIALIZE_CHUNK)
+    bulk_queries = results['serialize_bookmarks'][0]
+    if bulk_queries > expected:
+        print(f"\nFAIL: serialize_bookmarks issued {bulk_queries} queries, expected <= {expected}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
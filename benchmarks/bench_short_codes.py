@@ -0,0 +1,69 @@
+"""
+Throughput of the short code allocator.
+Run:  python benchmarks/bench_short_codes.py [--codes 2000000] [--batch 500] [--block-size 1000]
+
+Mints codes the way the importer does (allocate() per batch) and reports
+codes/s for each tenth of the run, so a slowdown as the keyspace fills would
+show up as a falling rate. Exits non-zero if any code repeats or has the
+wrong length.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--codes', type=int, default=2_000_000)
+    parser.add_argument('--batch', type=int, default=500, help='codes per allocate() call')
+    parser.add_argument('--block-size', type=int, default=1000, help='sequence numbers reserved per round trip')
+    parser.add_argument('--length', type=int, default=7)
+    args = parser.parse_args()
+
+    # a real file: blocks are reserved on their own connection
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+    os.environ['SHORT_CODE_BLOCK_SIZE'] = str(args.block_size)
+    os.environ['SHORT_CODE_LENGTH'] = str(args.length)
+
+    from app import create_app, db
+    from app.utils.short_codes import short_codes
+
+    app = create_app()
+    seen = set()
+    bad = 0
+    with app.app_context():
+        db.create_all()
+        step = max(args.codes // 10, args.batch)
+        minted = 0
+        start = last = time.perf_counter()
+        while minted < args.codes:
+            n = min(args.batch, args.codes - minted)
+            for code in short_codes.allocate(n):
+                if code in seen or len(code) != args.length:
+                    bad += 1
+                seen.add(code)
+            minted += n
+            if minted % step < n or minted == args.codes:
+                now = time.perf_counter()
+                print(f"{minted:>10,} codes  {step / (now - last):>12,.0f} codes/s")
+                last = now
+        total = time.perf_counter() - start
+        stats = short_codes.stats()
+
+    os.unlink(db_file)
+    print(f"\n{minted:,} codes in {total:.2f}s ({minted / total:,.0f} codes/s), "
+          f"{stats['reservations']} block reservations, keyspace {short_codes.space:,}")
+    if bad:
+        print(f"FAIL: {bad} duplicate or malformed codes")
+        sys.exit(1)
+    print("all codes unique")
+
+
+if __name__ == '__main__':
+    main()
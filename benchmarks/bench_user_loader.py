@@ -0,0 +1,109 @@
+"""
+Per-request cost of loading the logged-in user, with and without the identity cache.
+Run:  python benchmarks/bench_user_loader.py [--requests 2000] [--path /api/stats]
+
+Logs in through the test client, then issues the same authenticated request
+--requests times with the user cache disabled and again with it enabled,
+counting the SQL statements each request runs and timing it. The difference
+in queries per request is what the cache saves; with it enabled the user
+row should be read once for the whole run. Exits non-zero if the cached run
+does not save a query per request, or if a username change is not picked up
+right away.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def run(client, path, n, counter):
+    timings = []
+    counter[0] = 0
+    for _ in range(n):
+        start = time.perf_counter()
+        r = client.get(path, headers={'Accept': 'application/json'})
+        r.data
+        timings.append((time.perf_counter() - start) * 1000)
+        assert r.status_code == 200, (path, r.status_code)
+    return counter[0] / n, statistics.mean(timings), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--path', default='/api/stats', help='authenticated endpoint to request')
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+    os.environ['ENRICHMENT_ASYNC'] = 'false'
+
+    from sqlalchemy import event
+    from app import create_app, db
+    from app.models.user import User
+    from app.utils.user_cache import user_cache
+
+    app = create_app()
+    counter = [0]
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', name='Bench', email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        engine = db.engine
+
+    # requests run outside an app context: inside one, Flask-Login would keep the user on g
+    client = app.test_client()
+    r = client.post('/auth/login', data={'username': 'bench', 'password': 'bench'})
+    assert r.status_code in (200, 302), r.status_code
+    client.get(args.path)  # warm up
+
+    event.listen(engine, 'before_cursor_execute', count)
+    results = {}
+    ttl = user_cache.ttl
+    for label, enabled in (('uncached', False), ('cached', True)):
+        user_cache.ttl = ttl if enabled else 0
+        user_cache.clear()
+        before = user_cache.stats()
+        results[label] = run(client, args.path, args.requests, counter)
+        after = user_cache.stats()
+        queries, mean, median = results[label]
+        print(f"{label:>9}: {queries:.2f} queries/request  mean {mean:.3f} ms  median {median:.3f} ms  "
+              f"(cache hits {after['hits'] - before['hits']}, misses {after['misses'] - before['misses']})")
+    event.remove(engine, 'before_cursor_execute', count)
+
+    saved = results['uncached'][0] - results['cached'][0]
+    print(f"\nsaved {saved:.2f} queries and {results['uncached'][1] - results['cached'][1]:.3f} ms "
+          f"per request on {args.path}")
+    failed = saved < 0.99
+    if failed:
+        print('FAIL: the cache did not save a query per request')
+
+    # an ORM update must evict the cached identity immediately
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        user.username = 'bench2'
+        db.session.commit()
+        if user_cache.load(user_id).username != 'bench2':
+            print('FAIL: username change not visible through the cache')
+            failed = True
+        db.session.remove()
+        db.engine.dispose()
+
+    os.unlink(db_file)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+EXPLAIN every statement the hot endpoints issue and fail on full table scans.
+Run:  python benchmarks/explain_hot_queries.py [--users 20] [--bookmarks 300] [--database-url URL]
+
+Seeds a synthetic dataset, drives the listing, tag filter, tag list, sync,
+export, batch and delete endpoints through the test client while recording
+their SQL, then runs EXPLAIN (EXPLAIN QUERY PLAN on SQLite) on each
+statement. Exits non-zero if a table that grows with the user base is read
+with a full scan (SQLite "SCAN <table>", MySQL access type ALL / index), or
+if a paged (LIMIT) listing driven by user_bookmark sorts all of the user's
+rows instead of reading them in index order (SQLite temp B-tree, MySQL
+filesort). Either way a
+dropped or unusable index shows up as a failure instead of as latency that
+grows with the data.
+
+Uses a temporary SQLite file by default; --database-url must point at a
+scratch database, its tables are dropped and recreated.
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# tables that grow with the number of users; reading one of them in full is a regression
+WATCHED = {'bookmark', 'tag', 'user_bookmark', 'tag_user_bookmark', 'user_tag_count', 'bookmark_change', 'user_stats'}
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)')
+LIMITED = re.compile(r'\bLIMIT\b', re.I)
+# paged listings that start from this table must read it in index order, not sort it
+LISTING_TABLE = 'user_bookmark'
+
+
+def seed(db, n_users, n_bookmarks, n_tags):
+    from app.models.bookmark import Bookmark
+    from app.models.tag import Tag
+    from app.models.user import User
+    from app.models.user_bookmark import UserBookmark
+    from app.models.user_tag_count import UserTagCount
+    from app.models.tag_user_bookmark import tag_user_bookmarks
+    from datetime import datetime, timedelta
+
+    users = [{'id': u, 'username': f'user{u}', 'name': f'User {u}', 'email': f'user{u}@example.com',
+              'password_hash': 'x'} for u in range(1, n_users + 1)]
+    db.session.execute(db.insert(User), users)
+    db.session.execute(db.insert(Tag), [{'id': t, 'name': f'tag{t}'} for t in range(1, n_tags + 1)])
+
+    total = n_users * n_bookmarks
+    db.session.execute(db.insert(Bookmark), [
+        {'id': i, 'url': f'https://example.com/{i}', 'hash_url': f'h{i}', 'short_url': f's{i}'}
+        for i in range(1, total + 1)
+    ])
+    start = datetime(2024, 1, 1)
+    user_bookmarks, links, counts = [], [], {}
+    for i in range(1, total + 1):
+        user_id = (i - 1) // n_bookmarks + 1
+        user_bookmarks.append({
+            'user_id': user_id, 'bookmark_id': i, 'title': f'Bookmark {i}', 'notes': '',
+            'archived': i % 7 == 0, 'created_at': start + timedelta(minutes=i)
+        })
+        for tag_id in {i % n_tags + 1, (i * 7) % n_tags + 1}:
+            links.append({'tag_id': tag_id, 'user_id': user_id, 'bookmark_id': i})
+            counts[(user_id, tag_id)] = counts.get((user_id, tag_id), 0) + 1
+    db.session.execute(db.insert(UserBookmark), user_bookmarks)
+    db.session.execute(tag_user_bookmarks.insert(), links)
+    db.session.execute(db.insert(UserTagCount), [
+        {'user_id': u, 'tag_id': t, 'bookmark_count': c} for (u, t), c in counts.items()
+    ])
+    db.session.commit()
+
+
+def drive(app, client):
+    """Hit the hot endpoints as user1."""
+    paths = [
+        ('GET', '/api/bookmarks?format=json'),
+        ('GET', '/api/bookmarks?format=json&archived=true'),
+        ('GET', '/api/bookmarks?format=json&archived=false'),
+        ('GET', '/api/bookmarks?format=json&tag=tag3'),
+        ('GET', '/api/bookmarkstwo'),
+        ('GET', '/api/archived'),
+        ('GET', '/api/tags'),
+        ('GET', '/api/stats'),
+        ('GET', '/api/sync'),
+        ('GET', '/api/users/1/bookmarks?tag=tag3'),
+        ('GET', '/api/users/1/bookmarks?archived=false'),
+        ('GET', '/api/export?format=jsonl'),
+    ]
+    for method, path in paths:
+        r = client.open(path, method=method, headers={'Accept': 'application/json'})
+        r.data
+        assert r.status_code < 400, (path, r.status_code)
+
+    page = client.get('/api/bookmarks?format=json&per_page=5').get_json()
+    r = client.get(f"/api/bookmarks?format=json&per_page=5&cursor={page['next_cursor']}")
+    assert r.status_code == 200
+    ids = [b['id'] for b in page['bookmarks']]
+    since = client.get('/api/sync').get_json()['since']
+
+    r = client.post('/api/bookmarks/batch', json={'operations': [
+        {'op': 'archive', 'ids': ids[:2]},
+        {'op': 'remove_tags', 'ids': ids[:2], 'tags': ['tag3']},
+    ]})
+    assert r.status_code == 200, r.get_json()
+    r = client.delete(f'/api/bookmarks/{ids[-1]}')
+    assert r.status_code < 400, r.status_code
+    assert client.get(f'/api/sync?since={since}').status_code == 200
+
+
+def explain(conn, dialect, statement, params):
+    """Yields (table, detail) for every full scan, or sorted listing page, in the plan of `statement`."""
+    paged = bool(LIMITED.search(statement))
+    if dialect == 'sqlite':
+        plan = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, params)]
+        loops = [m.group(2) for m in (re.match(r'^(SCAN|SEARCH) (\w+)', d) for d in plan) if m]
+        for detail in plan:
+            m = SQLITE_SCAN.match(detail)
+            if m and m.group(1) in WATCHED:
+                yield m.group(1), detail
+            elif (paged and loops and loops[0] == LISTING_TABLE
+                  and detail.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in detail):
+                yield LISTING_TABLE, detail
+    else:
+        rows = list(conn.exec_driver_sql('EXPLAIN ' + statement, params).mappings())
+        for i, row in enumerate(rows):
+            if row.get('table') in WATCHED and row.get('type') in ('ALL', 'index'):
+                yield row['table'], f"type={row['type']} key={row.get('key')} rows={row.get('rows')}"
+            elif (paged and i == 0 and row.get('table') == LISTING_TABLE
+                  and 'filesort' in (row.get('Extra') or '')):
+                yield LISTING_TABLE, f"Extra={row['Extra']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--bookmarks', type=int, default=300, help='bookmarks per user')
+    parser.add_argument('--tags', type=int, default=500)
+    parser.add_argument('--database-url', help='scratch database to use instead of a temporary SQLite file')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print every plan, not only failures')
+    args = parser.parse_args()
+
+    db_file = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+    os.environ['ENRICHMENT_ASYNC'] = 'false'
+
+    from sqlalchemy import event
+    from app import create_app, db
+    from app.models.user import User
+
+    app = create_app()
+    statements = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb in ('SELECT', 'UPDATE', 'DELETE') and statement not in statements:
+            params = parameters[0] if executemany and parameters else parameters
+            statements[statement] = params
+
+    failures = 0
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(db, args.users, args.bookmarks, args.tags)
+        user = db.session.get(User, 1)
+        user.set_password('bench')
+        db.session.commit()
+        dialect = db.engine.dialect.name
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('ANALYZE' if dialect == 'sqlite' else
+                                 'ANALYZE TABLE bookmark, user_bookmark, tag_user_bookmark, user_tag_count')
+
+        client = app.test_client()
+        r = client.post('/auth/login', data={'username': 'user1', 'password': 'bench'})
+        assert r.status_code in (200, 302), r.status_code
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            drive(app, client)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        with db.engine.connect() as conn:
+            for statement, params in statements.items():
+                scans = list(explain(conn, dialect, statement, params))
+                if scans or args.verbose:
+                    print(('FAIL  ' if scans else 'ok    ') + ' '.join(statement.split())[:160 if not args.verbose else None])
+                for table, detail in scans:
+                    print(f'    {table}: {detail}')
+                failures += bool(scans)
+
+        db.session.remove()
+        db.engine.dispose()
+
+    if db_file:
+        os.unlink(db_file)
+    print(f'\n{len(statements)} statements explained on {dialect}, {failures} with full scans or unindexed sorts')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,449 @@
+"""
+Load test of the main endpoints against a synthetic dataset.
+Run:  python benchmarks/loadtest.py [--users 1000] [--bookmarks 100000] [--tags 2000]
+                                    [--requests 5000] [--concurrency 4] [--server]
+                                    [--out results.json] [--compare previous.json]
+
+Seeds a temporary database (or --database-url, whose tables are dropped)
+with bulk Core inserts: bookmarks spread over users, 1-4 tags each drawn
+from a Zipf distribution, a share of them archived or saved by a second
+user. The derived tables (tag counts, user stats, search index) are rebuilt
+in one pass each. Page fetches are replaced by a stub returning canned
+metadata after --fetch-latency-ms, so results don't depend on the network.
+
+The workload mixes redirect, list, tag filter, search, tags, create and
+export requests (see MIX, or --mix redirect=50,list=50), issued by
+--concurrency threads, each logged in as a different user, through the
+Flask test client or, with --server, over HTTP against a local threaded
+WSGI server. Reports throughput and p50/p95/p99 latency per endpoint;
+--out saves them as JSON and --compare prints the change against an
+earlier file. Exits non-zero if any request failed.
+
+Scale the dataset with the flags, e.g. --users 10000 --bookmarks 1000000
+for the full-size run (a few minutes of seeding on SQLite).
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PASSWORD = 'loadtest'
+CHUNK = 20000
+VOCABULARY = (
+    'python flask guide tutorial docs api design database index cache queue cloud deploy '
+    'security testing linux kernel network async rust golang javascript react css layout '
+    'performance profiling metrics logging search ranking compiler parser storage backup'
+).split()
+
+# endpoint -> relative weight
+MIX = {'redirect': 40, 'list': 20, 'list_tag': 8, 'search': 10, 'tags': 10, 'create': 10, 'export': 2}
+EXPECTED_STATUS = {'redirect': 302, 'create': 201}
+
+
+def zipf_weights(n, s):
+    """Cumulative weights for ranks 1..n, P(k) ~ 1 / k**s."""
+    return list(itertools.accumulate(1.0 / (k ** s) for k in range(1, n + 1)))
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+# ----------------------------------------------------------------------
+# Dataset
+# ----------------------------------------------------------------------
+def seed(db, args, rng):
+    from werkzeug.security import generate_password_hash
+    from app.models.bookmark import Bookmark, generate_url_hash
+    from app.models.tag import Tag
+    from app.models.user import User
+    from app.models.user_bookmark import UserBookmark
+    from app.models.tag_user_bookmark import tag_user_bookmarks
+    from app.utils.short_codes import short_codes
+    from app.utils.search_index import rebuild_search_index
+    from app.utils.tag_counter import rebuild_tag_counts
+    from app.utils.user_stats import rebuild_user_stats
+
+    timings = {}
+    started = time.perf_counter()
+
+    # one hash for everybody: hashing per user would dominate the seeding time
+    password_hash = generate_password_hash(PASSWORD)
+    for lo in range(1, args.users + 1, CHUNK):
+        db.session.execute(db.insert(User), [
+            {'id': u, 'username': f'user{u}', 'name': f'User {u}', 'email': f'user{u}@example.com',
+             'password_hash': password_hash}
+            for u in range(lo, min(lo + CHUNK, args.users + 1))
+        ])
+    db.session.execute(db.insert(Tag), [{'id': t, 'name': f'tag{t}'} for t in range(1, args.tags + 1)])
+    db.session.commit()
+    timings['users_tags'] = time.perf_counter() - started
+
+    tag_ids = range(1, args.tags + 1)
+    tag_weights = zipf_weights(args.tags, args.zipf)
+    now = datetime.utcnow()
+    t = time.perf_counter()
+    links = 0
+    for lo in range(1, args.bookmarks + 1, CHUNK):
+        ids = range(lo, min(lo + CHUNK, args.bookmarks + 1))
+        codes = short_codes.allocate(len(ids))
+        urls = {i: f'https://site{i % 997}.example.com/{" ".join(rng.choices(VOCABULARY, k=2)).replace(" ", "-")}/{i}'
+                for i in ids}
+        db.session.execute(db.insert(Bookmark), [
+            {'id': i, 'url': urls[i], 'hash_url': generate_url_hash(urls[i]), 'short_url': code}
+            for i, code in zip(ids, codes)
+        ])
+        user_bookmarks, tag_links = [], []
+        for i in ids:
+            owners = {rng.randint(1, args.users)}
+            if rng.random() < args.shared:
+                owners.add(rng.randint(1, args.users))
+            tags = set(rng.choices(tag_ids, cum_weights=tag_weights, k=rng.randint(1, 4)))
+            for user_id in owners:
+                user_bookmarks.append({
+                    'user_id': user_id, 'bookmark_id': i,
+                    'title': ' '.join(rng.choices(VOCABULARY, k=4)).title(),
+                    'notes': ' '.join(rng.choices(VOCABULARY, k=8)),
+                    'archived': rng.random() < args.archived,
+                    'created_at': now - timedelta(seconds=rng.randint(0, 365 * 86400)),
+                })
+                tag_links.extend({'tag_id': tag_id, 'user_id': user_id, 'bookmark_id': i} for tag_id in tags)
+        db.session.execute(db.insert(UserBookmark), user_bookmarks)
+        db.session.execute(tag_user_bookmarks.insert(), tag_links)
+        db.session.commit()
+        links += len(tag_links)
+    timings['bookmarks'] = time.perf_counter() - t
+
+    for name, rebuild in (('tag_counts', rebuild_tag_counts), ('user_stats', rebuild_user_stats),
+                          ('search_index', rebuild_search_index)):
+        t = time.perf_counter()
+        rebuild()
+        timings[name] = time.perf_counter() - t
+    timings['total'] = time.perf_counter() - started
+    return {'tag_links': links, 'seconds': {k: round(v, 2) for k, v in timings.items()}}
+
+
+def stub_page_fetches(latency_ms, rng_seed):
+    """Replace outbound page fetches with canned metadata."""
+    import app.utils.enrichment as enrichment_module
+    import app.utils.page_metadata as page_metadata
+
+    rng = random.Random(rng_seed)
+    lock = threading.Lock()
+
+    def fetch(url, timeout=None, etag=None, last_modified=None):
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        with lock:
+            words = rng.choices(VOCABULARY, k=3)
+        return {'title': ' '.join(words).title(), 'keywords': words[:2], 'description': None,
+                'etag': None, 'last_modified': None, 'bytes_read': 0}
+
+    page_metadata.fetch_page_metadata = fetch
+    enrichment_module.fetch_page_metadata = fetch
+
+
+# ----------------------------------------------------------------------
+# Workload
+# ----------------------------------------------------------------------
+class Fixture:
+    """What the request generators draw from: short codes by popularity, users' top tags."""
+
+    def __init__(self, db, args):
+        from app.models.bookmark import Bookmark
+        from app.models.user_stats import UserStats
+
+        self.short_codes = db.session.execute(
+            db.select(Bookmark.short_url).order_by(Bookmark.id).limit(args.hot_bookmarks)
+        ).scalars().all()
+        self.code_weights = zipf_weights(len(self.short_codes), 1.0)
+        # the busiest users, so every session has a non-trivial listing
+        rows = db.session.execute(
+            db.select(UserStats.user_id, UserStats.top_tags)
+            .order_by(UserStats.bookmark_count.desc()).limit(args.concurrency)
+        ).all()
+        self.users = [(user_id, [t['name'] for t in json.loads(top)] or ['tag1']) for user_id, top in rows]
+        self.new_urls = itertools.count()
+        self.run_id = int(time.time())
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, **kw):
+        r = self.client.open(path, method=method, **kw)
+        r.get_data()  # drain streamed bodies so their time is counted
+        return r.status_code
+
+
+class HttpTransport:
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def request(self, method, path, data=None, json=None, headers=None):
+        r = self.session.request(method, self.base_url + path, data=data, json=json,
+                                 headers=headers, allow_redirects=False)
+        r.content
+        return r.status_code
+
+
+def build_request(endpoint, fixture, user_tags, rng):
+    """(method, path, kwargs) for one request of `endpoint`."""
+    accept = {'headers': {'Accept': 'application/json'}}
+    if endpoint == 'redirect':
+        code = rng.choices(fixture.short_codes, cum_weights=fixture.code_weights)[0]
+        return 'GET', f'/{code}', {}
+    if endpoint == 'list':
+        return 'GET', '/api/bookmarks?format=json', accept
+    if endpoint == 'list_tag':
+        return 'GET', f'/api/bookmarks?format=json&tag={rng.choice(user_tags)}', accept
+    if endpoint == 'search':
+        return 'GET', f'/api/bookmarks?format=json&q={rng.choice(VOCABULARY)}', accept
+    if endpoint == 'tags':
+        return 'GET', '/api/tags', accept
+    if endpoint == 'create':
+        n = next(fixture.new_urls)
+        url = f'https://new{n % 101}.example.org/loadtest/{fixture.run_id}/{n}'
+        return 'POST', '/api/bookmarks', {'json': {'url': url, 'tags': rng.sample(user_tags, min(2, len(user_tags)))}}
+    if endpoint == 'export':
+        return 'GET', '/api/export?format=jsonl', {}
+    raise ValueError(endpoint)
+
+
+def worker(transport, fixture, user, mix, n_requests, warmup, seed_value, results, errors):
+    rng = random.Random(seed_value)
+    user_id, user_tags = user
+    status = transport.request('POST', '/auth/login', data={'username': f'user{user_id}', 'password': PASSWORD})
+    if status not in (200, 302):
+        errors.append(('login', status))
+        return
+    endpoints, weights = zip(*mix.items())
+    for i in range(warmup + n_requests):
+        endpoint = rng.choices(endpoints, weights=weights)[0]
+        method, path, kw = build_request(endpoint, fixture, user_tags, rng)
+        started = time.perf_counter()
+        try:
+            status = transport.request(method, path, **kw)
+        except Exception as exc:
+            status = repr(exc)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if i < warmup:
+            continue
+        if status != EXPECTED_STATUS.get(endpoint, 200):
+            errors.append((endpoint, status))
+        else:
+            results.setdefault(endpoint, []).append(elapsed_ms)
+
+
+def run_workload(app, fixture, args, mix):
+    server = None
+    if args.server:
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+    per_thread = [args.requests // args.concurrency + (i < args.requests % args.concurrency)
+                  for i in range(args.concurrency)]
+    results = [{} for _ in range(args.concurrency)]
+    errors = []
+    threads = []
+    for i, user in enumerate(fixture.users[:args.concurrency]):
+        transport = HttpTransport(base_url) if server else TestClientTransport(app)
+        threads.append(threading.Thread(target=worker, args=(
+            transport, fixture, user, mix, per_thread[i], args.warmup, args.seed + i, results[i], errors
+        )))
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    if server:
+        server.shutdown()
+
+    merged = {}
+    for r in results:
+        for endpoint, values in r.items():
+            merged.setdefault(endpoint, []).extend(values)
+    return merged, errors, elapsed
+
+
+def summarize(samples, errors, elapsed):
+    report = {}
+    error_counts = {}
+    for endpoint, _ in errors:
+        error_counts[endpoint] = error_counts.get(endpoint, 0) + 1
+    for endpoint in sorted(set(samples) | set(error_counts)):
+        values = sorted(samples.get(endpoint, []))
+        report[endpoint] = {
+            'requests': len(values),
+            'errors': error_counts.get(endpoint, 0),
+            'throughput_rps': round(len(values) / elapsed, 1) if elapsed else None,
+            'mean_ms': round(sum(values) / len(values), 2) if values else None,
+            'p50_ms': _round(percentile(values, 50)),
+            'p95_ms': _round(percentile(values, 95)),
+            'p99_ms': _round(percentile(values, 99)),
+            'max_ms': _round(values[-1] if values else None),
+        }
+    total = sum(len(v) for v in samples.values())
+    report['_all'] = {
+        'requests': total,
+        'errors': len(errors),
+        'throughput_rps': round(total / elapsed, 1) if elapsed else None,
+        'elapsed_s': round(elapsed, 2),
+    }
+    return report
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def print_report(report, previous=None):
+    print(f"\n{'endpoint':<10} {'reqs':>7} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for endpoint, r in report.items():
+        if endpoint == '_all':
+            continue
+        print(f"{endpoint:<10} {r['requests']:>7} {r['errors']:>5} {r['throughput_rps'] or 0:>9.1f} "
+              f"{r['p50_ms'] or 0:>9.2f} {r['p95_ms'] or 0:>9.2f} {r['p99_ms'] or 0:>9.2f} {r['max_ms'] or 0:>9.2f}")
+        old = (previous or {}).get(endpoint)
+        if old:
+            deltas = []
+            for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+                if old.get(key) and r.get(key) is not None:
+                    deltas.append(f"{key.replace('_ms', '').replace('_rps', '')} {100 * (r[key] - old[key]) / old[key]:+.1f}%")
+            print(f"{'':<10} vs previous: " + ', '.join(deltas))
+    a = report['_all']
+    print(f"\n{a['requests']} requests in {a['elapsed_s']}s: {a['throughput_rps']} req/s, {a['errors']} errors")
+
+
+def parse_mix(text):
+    if not text:
+        return dict(MIX)
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in MIX:
+            raise SystemExit(f'unknown endpoint {name!r}; choose from {", ".join(MIX)}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    data = parser.add_argument_group('dataset')
+    data.add_argument('--users', type=int, default=1000)
+    data.add_argument('--bookmarks', type=int, default=100000)
+    data.add_argument('--tags', type=int, default=2000)
+    data.add_argument('--zipf', type=float, default=1.1, help='tag popularity exponent')
+    data.add_argument('--shared', type=float, default=0.1, help='share of bookmarks saved by a second user')
+    data.add_argument('--archived', type=float, default=0.1, help='share of saves that are archived')
+    data.add_argument('--database-url', help='scratch database instead of a temporary SQLite file (tables are dropped)')
+    load = parser.add_argument_group('workload')
+    load.add_argument('--requests', type=int, default=5000, help='measured requests, across all threads')
+    load.add_argument('--warmup', type=int, default=20, help='unmeasured requests per thread')
+    load.add_argument('--concurrency', type=int, default=4)
+    load.add_argument('--mix', help='endpoint weights, e.g. redirect=50,list=30,search=20')
+    load.add_argument('--server', action='store_true', help='go through a local WSGI server instead of the test client')
+    load.add_argument('--fetch-latency-ms', type=float, default=0, help='delay of the stubbed page fetch')
+    load.add_argument('--hot-bookmarks', type=int, default=10000, help='short codes the redirect traffic is drawn from')
+    load.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='earlier --out file to compare against')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+    args.concurrency = max(1, min(args.concurrency, args.users))
+
+    db_file = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+    os.environ['ENRICHMENT_ASYNC'] = 'false'
+
+    from app import create_app, db
+
+    stub_page_fetches(args.fetch_latency_ms, args.seed)
+    app = create_app()
+    rng = random.Random(args.seed)
+    try:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            print(f'seeding {args.users} users, {args.bookmarks} bookmarks, {args.tags} tags ...')
+            dataset = seed(db, args, rng)
+            print(f"seeded in {dataset['seconds']['total']}s {dataset['seconds']}")
+            fixture = Fixture(db, args)
+            dialect = db.engine.dialect.name
+            db.session.remove()
+
+        mode = 'server' if args.server else 'test client'
+        print(f'running {args.requests} requests, {args.concurrency} threads, {mode} ...')
+        samples, errors, elapsed = run_workload(app, fixture, args, mix)
+    finally:
+        app.extensions['click_buffer'].flush()
+        if db_file:
+            with app.app_context():
+                db.engine.dispose()
+            os.unlink(db_file)
+
+    report = summarize(samples, errors, elapsed)
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)['results']
+    print_report(report, previous)
+    for endpoint, status in errors[:10]:
+        print(f'  failed {endpoint}: {status}')
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'database': dialect,
+                'mode': 'server' if args.server else 'test_client',
+                'params': {k: v for k, v in vars(args).items() if k not in ('out', 'compare', 'database_url')},
+                'mix': mix,
+                'dataset': dataset,
+                'results': report,
+            }, f, indent=2)
+        print(f'results written to {args.out}')
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
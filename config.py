@@ -10,4 +10,74 @@ BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SECRET_KEY = 'dev-secret-key-change-in-production'
\ No newline at end of file
+    SECRET_KEY = 'dev-secret-key-change-in-production'
+
+    # background metadata enrichment for new bookmarks
+    ENRICHMENT_ASYNC = os.getenv("ENRICHMENT_ASYNC", "true").lower() == "true"
+    ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", 4))
+    ENRICHMENT_MAX_PENDING = int(os.getenv("ENRICHMENT_MAX_PENDING", 1000))
+    ENRICHMENT_HOST_INTERVAL = float(os.getenv("ENRICHMENT_HOST_INTERVAL", 1.0))  # seconds between hits to one host (workers only)
+    ENRICHMENT_MAX_RETRIES = int(os.getenv("ENRICHMENT_MAX_RETRIES", 3))  # workers only; inline fetches try once
+    ENRICHMENT_BACKOFF = float(os.getenv("ENRICHMENT_BACKOFF", 1.0))
+
+    # shared page metadata cache (seconds before a cached entry is revalidated)
+    METADATA_CACHE_TTL = int(os.getenv("METADATA_CACHE_TTL", 7 * 24 * 3600))
+
+    # in-process short_code -> URL cache for the redirect endpoint (entries)
+    SHORT_CODE_CACHE_SIZE = int(os.getenv("SHORT_CODE_CACHE_SIZE", 10000))
+
+    # redirect click counters are buffered in memory and flushed in batches
+    CLICK_FLUSH_INTERVAL = float(os.getenv("CLICK_FLUSH_INTERVAL", 5.0))   # seconds
+    CLICK_FLUSH_THRESHOLD = int(os.getenv("CLICK_FLUSH_THRESHOLD", 1000))  # pending clicks
+
+    # keyset pagination for bookmark listings
+    BOOKMARKS_PAGE_SIZE = int(os.getenv("BOOKMARKS_PAGE_SIZE", 50))
+    BOOKMARKS_MAX_PAGE_SIZE = int(os.getenv("BOOKMARKS_MAX_PAGE_SIZE", 200))
+
+    # bulk import: records written per transaction
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+
+    # in-process tag name -> id cache (entries)
+    TAG_CACHE_SIZE = int(os.getenv("TAG_CACHE_SIZE", 5000))
+
+    # POST /api/bookmarks/batch: bookmark ids accepted per request, across all operations
+    BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", 5000))
+
+    # precomputed per-user dashboard stats: most used tags kept on the row
+    USER_STATS_TOP_TAGS = int(os.getenv("USER_STATS_TOP_TAGS", 10))
+
+    # GET /api/sync: bookmarks (or tombstones) per page
+    SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", 500))
+    SYNC_MAX_PAGE_SIZE = int(os.getenv("SYNC_MAX_PAGE_SIZE", 2000))
+
+    # rendered QR images kept in memory (total bytes), and how long clients may cache them
+    QR_CACHE_MAX_BYTES = int(os.getenv("QR_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+    QR_MAX_AGE = int(os.getenv("QR_MAX_AGE", 365 * 24 * 3600))
+
+    # short codes: fixed length (legacy random codes are 6 chars, keep this different),
+    # sequence numbers reserved per process in blocks of this size
+    SHORT_CODE_LENGTH = int(os.getenv("SHORT_CODE_LENGTH", 7))
+    SHORT_CODE_BLOCK_SIZE = int(os.getenv("SHORT_CODE_BLOCK_SIZE", 1000))
+    SHORT_CODE_SCRAMBLE = os.getenv("SHORT_CODE_SCRAMBLE", "true").lower() == "true"
+
+    # connection pool (ignored on SQLite); see app.utils.db_pool.engine_options
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))    # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))    # seconds, keep below the server's wait_timeout
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", 10))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))  # 0 = no limit
+    DB_POOL_SLOW_CHECKOUT_MS = float(os.getenv("DB_POOL_SLOW_CHECKOUT_MS", 100))  # log requests that waited longer
+
+    # opt-in request instrumentation: Server-Timing headers and Prometheus metrics at METRICS_PATH
+    INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "false").lower() == "true"
+    INSTRUMENTATION_MAX_QUERIES = int(os.getenv("INSTRUMENTATION_MAX_QUERIES", 50))     # log requests issuing more
+    INSTRUMENTATION_SLOW_SQL_MS = float(os.getenv("INSTRUMENTATION_SLOW_SQL_MS", 250))  # log slower statements
+    METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # when set, scrapers must send "Authorization: Bearer <token>"
+
+    # logged-in user identity (id, username) cached per process by the Flask-Login user_loader;
+    # ORM updates evict it locally, other workers see changes after at most the TTL (0 disables)
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
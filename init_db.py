@@ -1,17 +1,32 @@
 """
 LinkVault Dummy Data Initializer (Auth-Ready)
 Run:  python init_db.py
+      python init_db.py --bulk --users 10000 --bookmarks 1000000   # staging-sized data
+
+The default mode creates the demo users and bookmarks below through the ORM.
+--bulk writes synthetic rows built from the same templates with Core
+executemany inserts and precomputed ids, then rebuilds the derived tables
+(tag counts, user stats, search index) in one pass each.
 """
 
+import argparse
+import time
 from app import create_app, db
 from app.models.bookmark import Bookmark, normalize_url, generate_url_hash
 from app.models.tag import Tag
 from app.models.user import User
 from app.models.user_bookmark import UserBookmark
 from app.models.tag_user_bookmark import tag_user_bookmarks
-from datetime import datetime
+from app.utils.tags import tag_bookmarks, clean_tag_names
+from werkzeug.security import generate_password_hash
+from datetime import datetime, timedelta
 import random
 
+DEMO_PASSWORD = "password123"
+# test data only: a single cheap hash shared by every seeded user
+TEST_PASSWORD_METHOD = "pbkdf2:sha256:1000"
+BULK_BATCH_SIZE = 10000
+
 # ----------------------------------------------------------------------
 # Dummy data
 # ----------------------------------------------------------------------
@@ -53,6 +68,21 @@ DUMMY_BOOKMARKS = [
 ]
 
 # ----------------------------------------------------------------------
+def test_password_hash(password=DEMO_PASSWORD):
+    return generate_password_hash(password, method=TEST_PASSWORD_METHOD)
+
+
+def print_logins(users):
+    print("Sample curl commands:")
+    for u in users[:4]:
+        print(f'curl "http://127.0.0.1:5000/api/bookmarks?user_id={u.id}"')
+    print("\nLogin (Flask-Login ready):")
+    for u in users[:4]:
+        print(f'curl -X POST http://127.0.0.1:5000/auth/login '
+              f'-H "Content-Type: application/json" '
+              f'-d \'{{"username":"{u.username}","password":"{DEMO_PASSWORD}"}}\' -c cookie.txt')
+
+
 def init_db_with_data():
     app = create_app()
     with app.app_context():
@@ -63,88 +93,184 @@ def init_db_with_data():
 
         # ------------------- USERS -------------------
         users = []
+        password_hash = test_password_hash()
         print(f"\nCreating {len(DUMMY_USERS)} users...")
         for ud in DUMMY_USERS:
             user = User(
                 username=ud["username"],
                 name=ud["name"],
-                email=ud["email"]
+                email=ud["email"],
+                password_hash=password_hash   # same password for demo
             )
-            user.set_password("password123")   # same password for demo
             db.session.add(user)
-            db.session.flush()
             users.append(user)
+        db.session.flush()
+        for user in users:
             print(f"  → {user.username} (id={user.id})")
+        # short codes reserve their block in a separate transaction; on
+        # SQLite that needs the write lock, so don't hold it open here
+        db.session.commit()
 
         # ------------------- BOOKMARKS & TAGS -------------------
-        bookmarks = []
-        print(f"\nAdding {len(DUMMY_BOOKMARKS)} bookmarks...")
+        # the tables were just created: dedupe on the normalized url in memory
+        sources = {}
         for item in DUMMY_BOOKMARKS:
-            norm = normalize_url(item["url"])
-            h = generate_url_hash(norm)
-
-            bm = Bookmark.query.filter_by(hash_url=h).first()
-            if not bm:
-                bm = Bookmark(url=norm)
-                bm.set_hash()
-                bm.set_short_url()
-                db.session.add(bm)
-                db.session.flush()
+            sources.setdefault(normalize_url(item["url"]), item)
 
+        print(f"\nAdding {len(sources)} bookmarks...")
+        bookmarks = []
+        for norm in sources:
+            bm = Bookmark(url=norm)
+            bm.set_hash()
+            bm.set_short_url()
+            db.session.add(bm)
             bookmarks.append(bm)
-
         db.session.commit()
         print("Bookmarks created!")
 
         # ------------------- ASSIGN BOOKMARKS TO USERS -------------------
         print("\nAssigning bookmarks to users (shared + private)...")
         for bm in bookmarks:
-            chosen = random.sample(users, k=random.randint(1, 3))
-
-            for user in chosen:
-                src = next((x for x in DUMMY_BOOKMARKS if normalize_url(x["url"]) == bm.url), None)
-                title = src["title"] if src else "Untitled"
-                notes = src["notes"] + f" (saved by {user.username})" if src else ""
-                archived = src["archived"] if src else False
-
-                ub = UserBookmark(
+            src = sources[bm.url]
+            for user in random.sample(users, k=random.randint(1, 3)):
+                db.session.add(UserBookmark(
                     user_id=user.id,
                     bookmark_id=bm.id,
-                    title=title,
-                    notes=notes,
-                    archived=archived
-                )
-                db.session.add(ub)
-
-                if src:
-                    for tname in src["tags"]:
-                        tname = tname.lower()
-                        tag = Tag.query.filter_by(name=tname).first()
-                        if not tag:
-                            tag = Tag(name=tname)
-                            db.session.add(tag)
-                            db.session.flush()
-                        db.session.execute(
-                            tag_user_bookmarks.insert().values(
-                                tag_id=tag.id,
-                                user_id=user.id,
-                                bookmark_id=bm.id
-                            )
-                        )
+                    title=src["title"],
+                    notes=src["notes"] + f" (saved by {user.username})",
+                    archived=src["archived"]
+                ))
+                tag_bookmarks(user.id, [bm.id], src["tags"])
         db.session.commit()
-        print("Assignment complete – tag counts auto-updated by after_flush")
+        print("Assignment complete – tag counts applied on commit")
 
         # ------------------- DONE -------------------
         print("\nDB initialization complete!\n")
-        print("Sample curl commands:")
-        for u in users:
-            print(f'curl "http://127.0.0.1:5000/api/bookmarks?user_id={u.id}"')
-        print("\nLogin (Flask-Login ready):")
-        for u in users:
-            print(f'curl -X POST http://127.0.0.1:5000/auth/login '
-                  f'-H "Content-Type: application/json" '
-                  f'-d \'{{"username":"{u.username}","password":"password123"}}\' -c cookie.txt')
+        print_logins(users)
+
+
+# ----------------------------------------------------------------------
+def _insert_chunked(table, rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[start:start + batch_size])
+
+
+def init_db_bulk(n_users, n_bookmarks, shared=0.1, batch_size=BULK_BATCH_SIZE,
+                 search_index=True, seed=None):
+    """
+    Synthetic data at scale: `n_bookmarks` distinct urls derived from
+    DUMMY_BOOKMARKS, each saved by one user (round robin) and by a second
+    random one with probability `shared`. Rows go in with executemany inserts
+    of `batch_size`, one commit per batch; ids are assigned here.
+    """
+    from app.utils.short_codes import short_codes
+    from app.utils.tag_counter import rebuild_tag_counts
+    from app.utils.user_stats import rebuild_user_stats
+    from app.utils.search_index import rebuild_search_index
+
+    rng = random.Random(seed)
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        print("Dropping all tables...")
+        db.drop_all()
+        print("Creating tables...")
+        db.create_all()
+
+        # ------------------- USERS -------------------
+        t = time.perf_counter()
+        password_hash = test_password_hash()
+        users = [dict(ud) for ud in DUMMY_USERS[:n_users]]
+        users += [
+            {"username": f"user{i}", "name": f"User {i}", "email": f"user{i}@example.com"}
+            for i in range(len(users) + 1, n_users + 1)
+        ]
+        for user_id, user in enumerate(users, start=1):
+            user.update(id=user_id, password_hash=password_hash)
+        _insert_chunked(User.__table__, users, batch_size)
+
+        # ------------------- TAGS -------------------
+        templates = []
+        tag_ids = {}
+        for item in DUMMY_BOOKMARKS:
+            names = clean_tag_names(item["tags"])
+            for name in names:
+                tag_ids.setdefault(name, len(tag_ids) + 1)
+            templates.append((normalize_url(item["url"]), item, [tag_ids[n] for n in names]))
+        db.session.execute(Tag.__table__.insert(), [{"id": i, "name": n} for n, i in tag_ids.items()])
+        db.session.commit()
+        print(f"{len(users)} users, {len(tag_ids)} tags ({time.perf_counter() - t:.1f}s)")
+
+        # ------------------- BOOKMARKS -------------------
+        t = time.perf_counter()
+        saves = links = 0
+        now = datetime.utcnow()
+        for start in range(1, n_bookmarks + 1, batch_size):
+            ids = range(start, min(start + batch_size, n_bookmarks + 1))
+            # reserved before this batch writes anything (SQLite: one writer at a time)
+            codes = short_codes.allocate(len(ids))
+            bookmark_rows, ub_rows, link_rows = [], [], []
+            for bookmark_id, code in zip(ids, codes):
+                base, item, item_tags = rng.choice(templates)
+                url = f"{base}/item/{bookmark_id}"
+                bookmark_rows.append({"id": bookmark_id, "url": url,
+                                      "hash_url": generate_url_hash(url), "short_url": code})
+
+                owners = {(bookmark_id - 1) % n_users + 1}
+                if n_users > 1 and rng.random() < shared:
+                    owners.add(rng.randint(1, n_users))
+                created_at = now - timedelta(seconds=n_bookmarks - bookmark_id)
+                for user_id in owners:
+                    ub_rows.append({
+                        "user_id": user_id, "bookmark_id": bookmark_id,
+                        "title": f'{item["title"]} #{bookmark_id}',
+                        "notes": f'{item["notes"]} (saved by {users[user_id - 1]["username"]})',
+                        "archived": item["archived"], "created_at": created_at,
+                    })
+                    link_rows.extend({"tag_id": tag_id, "user_id": user_id, "bookmark_id": bookmark_id}
+                                     for tag_id in item_tags)
+            db.session.execute(Bookmark.__table__.insert(), bookmark_rows)
+            db.session.execute(UserBookmark.__table__.insert(), ub_rows)
+            db.session.execute(tag_user_bookmarks.insert(), link_rows)
+            db.session.commit()
+            saves += len(ub_rows)
+            links += len(link_rows)
+        print(f"{n_bookmarks} bookmarks, {saves} saves, {links} tag links ({time.perf_counter() - t:.1f}s)")
+
+        # ------------------- DERIVED TABLES -------------------
+        rebuilds = [("tag counts", rebuild_tag_counts), ("user stats", rebuild_user_stats)]
+        if search_index:
+            rebuilds.append(("search index", rebuild_search_index))
+        for name, rebuild in rebuilds:
+            t = time.perf_counter()
+            rebuild()
+            print(f"rebuilt {name} ({time.perf_counter() - t:.1f}s)")
+
+        print(f"\nDB initialization complete in {time.perf_counter() - started:.1f}s!\n")
+        print_logins([User(id=u["id"], username=u["username"]) for u in users])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reset the database and fill it with test data.")
+    parser.add_argument("--bulk", action="store_true", help="synthetic data at scale, via Core bulk inserts")
+    parser.add_argument("--users", type=int, default=100, help="--bulk: number of users")
+    parser.add_argument("--bookmarks", type=int, default=10000, help="--bulk: number of distinct bookmarks")
+    parser.add_argument("--shared", type=float, default=0.1,
+                        help="--bulk: share of bookmarks also saved by a second user")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE, help="--bulk: rows per insert batch")
+    parser.add_argument("--no-search-index", action="store_true",
+                        help="--bulk: skip the search index (rebuild later with flask rebuild-search-index)")
+    parser.add_argument("--seed", type=int, help="--bulk: random seed, for reproducible data")
+    args = parser.parse_args()
+
+    if not args.bulk:
+        init_db_with_data()
+        return
+    if args.users < 1 or args.bookmarks < 0:
+        parser.error("--users must be at least 1 and --bookmarks not negative")
+    init_db_bulk(args.users, args.bookmarks, shared=args.shared, batch_size=args.batch_size,
+                 search_index=not args.no_search_index, seed=args.seed)
 
 
 if __name__ == "__main__":
-    init_db_with_data()
+    main()
@@ -0,0 +1,58 @@
+"""full-text search table
+
+Revision ID: 0005_bookmark_search
+Revises: 0004_click_counts
+Create Date: 2026-10-18 16:20:41.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_bookmark_search'
+down_revision = '0004_click_counts'
+branch_labels = None
+depends_on = None
+
+# same DDL as app.utils.search_index.create_search_table, frozen here
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS bookmark_search USING fts5("
+    "owner, title, notes, url, bookmark_id UNINDEXED, "
+    "tokenize='unicode61', prefix='2 3')"
+)
+MYSQL_DDL = (
+    "CREATE TABLE IF NOT EXISTS bookmark_search ("
+    "user_id INT NOT NULL, bookmark_id INT NOT NULL, "
+    "title VARCHAR(255), notes TEXT, url VARCHAR(255), "
+    "PRIMARY KEY (user_id, bookmark_id), "
+    "FULLTEXT KEY ft_bookmark_search (title, notes, url)"
+    ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+)
+
+
+def upgrade():
+    # other databases have no index; search falls back to ILIKE there
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(SQLITE_DDL)
+        # rowid packs (user_id, bookmark_id) like search_index._rowid
+        op.execute(
+            "INSERT INTO bookmark_search (rowid, owner, title, notes, url, bookmark_id) "
+            "SELECT (ub.user_id << 32) | ub.bookmark_id, 'u' || ub.user_id, "
+            "COALESCE(ub.title, ''), COALESCE(ub.notes, ''), COALESCE(b.url, ''), ub.bookmark_id "
+            "FROM user_bookmark ub JOIN bookmark b ON b.id = ub.bookmark_id"
+        )
+    elif dialect == 'mysql':
+        op.execute(MYSQL_DDL)
+        op.execute(
+            "INSERT INTO bookmark_search (user_id, bookmark_id, title, notes, url) "
+            "SELECT ub.user_id, ub.bookmark_id, COALESCE(ub.title, ''), COALESCE(ub.notes, ''), "
+            "COALESCE(b.url, '') "
+            "FROM user_bookmark ub JOIN bookmark b ON b.id = ub.bookmark_id"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name in ('sqlite', 'mysql'):
+        op.execute("DROP TABLE IF EXISTS bookmark_search")